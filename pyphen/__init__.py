@@ -21,37 +21,110 @@ Pure Python module to hyphenate text, inspired by Ruby's Text::Hyphen.
 
 """
 
+import hashlib
+import math
+import mmap
 import os
 import re
-from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+import struct
+import sys
+import threading
+import warnings
+from array import array
+from collections import OrderedDict, deque
+from functools import partial
+from itertools import islice
+from typing import (
+    Any, Callable, Dict, Iterable, Iterator, List, Mapping, MutableMapping,
+    Optional, Tuple, Union)
 
 VERSION = __version__ = '0.11.0'
 
-__all__ = ('Pyphen', 'LANGUAGES', 'language_fallback')
+__all__ = ('Pyphen', 'LANGUAGES', 'language_fallback', 'preload')
 
-# cache of per-file HyphDict objects
-hdcache: Dict[str, 'HyphDict'] = {}
+# compiled dictionaries, see ``HyphDict.save``
+COMPILED_MAGIC = b'PYPHEN\x00\x00'
+COMPILED_VERSION = 4
+COMPILED_EXTENSION = '.pyphen'
+# magic, byte order, version, nodes, patterns, maxlen, labels, values,
+# alternatives, source size, source mtime, source digest
+compiled_header = struct.Struct('<8s2sHIIIIIIqq20s')
+byteorder = b'le' if sys.byteorder == 'little' else b'be'
+
+# Pyphen object used by the current process when it is a pool worker
+worker: Optional['Pyphen'] = None
+
+# digests of dictionary files, keyed by filename, size and modification time
+digests: Dict[Tuple[str, int, int], str] = {}
+
+# default value of arguments whose current value is kept when not given
+unchanged: Any = object()
 
 # precompile some stuff
 parse_hex = re.compile(r'\^{2}([0-9a-f]{2})').sub
 parse: Callable[[str], Iterable[Tuple[str, str]]
                 ] = re.compile(r'(\d?)(\D?)').findall
+# words of a text, including the combining marks of Indic scripts
+word_characters = re.compile(r'[\w\u0300-\u036f\u0900-\u0dff]+')
+# hyphens and apostrophes separating the components of compound words
+compound_separators = re.compile("[-\u2010'\u2019]")
+# separators between letters of compound words, where words can be split
+# without adding a hyphen
+compound_breaks = re.compile(
+    "(?<=[\\w\u0300-\u036f\u0900-\u0dff])[-\u2010'\u2019]"
+    "(?=[\\w\u0300-\u036f\u0900-\u0dff])")
+
+dictionaries_root = os.path.join(os.path.dirname(__file__), 'dictionaries')
+
+
+class Languages(MutableMapping[str, str]):
+    """Mapping of language names to dictionary filenames.
+
+    The dictionaries folder is only listed when the mapping is first used,
+    so that importing the module stays cheap.
+
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._languages: Optional[Dict[str, str]] = None
+
+    @property
+    def languages(self) -> Dict[str, str]:
+        """Mapping of the available languages, listed when first needed."""
+        if self._languages is None:
+            languages: Dict[str, str] = {}
+            for filename in sorted(os.listdir(self.root)):
+                if filename.endswith('.dic'):
+                    name = filename[5:-4]
+                    full_path = os.path.join(self.root, filename)
+                    languages[name] = full_path
+                    short_name = name.split('_')[0]
+                    if short_name not in languages:
+                        languages[short_name] = full_path
+            self._languages = languages
+        return self._languages
+
+    def __getitem__(self, language: str) -> str:
+        return self.languages[language]
+
+    def __setitem__(self, language: str, filename: str):
+        self.languages[language] = filename
+
+    def __delitem__(self, language: str):
+        del self.languages[language]
 
-try:
-    from pkg_resources import resource_filename
-    dictionaries_root = resource_filename('pyphen', 'dictionaries')
-except ImportError:
-    dictionaries_root = os.path.join(os.path.dirname(__file__), 'dictionaries')
+    def __contains__(self, language: Any) -> bool:
+        return language in self.languages
 
-LANGUAGES: Dict[str, str] = {}
-for filename in sorted(os.listdir(dictionaries_root)):
-    if filename.endswith('.dic'):
-        name = filename[5:-4]
-        full_path = os.path.join(dictionaries_root, filename)
-        LANGUAGES[name] = full_path
-        short_name = name.split('_')[0]
-        if short_name not in LANGUAGES:
-            LANGUAGES[short_name] = full_path
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.languages)
+
+    def __len__(self) -> int:
+        return len(self.languages)
+
+
+LANGUAGES = Languages(dictionaries_root)
 
 
 def language_fallback(language: str):
@@ -73,6 +146,101 @@ def language_fallback(language: str):
     raise KeyError(f'Fallback not found for {language}')
 
 
+def dictionary_key(filename: str, read: bool = True) -> Optional[str]:
+    """Get a key identifying the content of a dictionary file.
+
+    :param filename: filename of hyph_*.dic or of a compiled dictionary
+    :param read: if ``False``, return ``None`` instead of reading the whole
+        file when its key is not known yet
+
+    Comments are ignored, so that files with the same patterns, such as the
+    included dictionaries of German variants, get the same key and thus share
+    the same ``HyphDict``.
+
+    The key is read from the header of the compiled dictionary when it is up
+    to date, so that the ``hyph_*.dic`` file is not read. Keys of files
+    already read by ``HyphDict`` are remembered, as long as the files are not
+    modified.
+
+    """
+    stat = os.stat(filename)
+    key = filename, stat.st_size, stat.st_mtime_ns
+    if key not in digests:
+        digest = _compiled_digest(filename, key[1:])
+        if digest is None:
+            if not read:
+                return None
+            sha1 = hashlib.sha1()
+            with open(filename, 'rb') as stream:
+                for line in stream:
+                    if not line.strip().startswith((b'%', b'#')):
+                        sha1.update(line)
+            digest = sha1.hexdigest()
+        digests[key] = digest
+    return digests[key]
+
+
+def _compiled_digest(filename: str, source: Tuple[int, int]
+                     ) -> Optional[str]:
+    """Get the digest stored in the compiled version of a dictionary."""
+    for path in (filename, compiled_filename(filename)):
+        try:
+            with open(path, 'rb') as stream:
+                header = stream.read(compiled_header.size)
+        except OSError:
+            continue
+        if len(header) < compiled_header.size:
+            continue
+        magic, _, version, *_, size, mtime, digest = (
+            compiled_header.unpack(header))
+        if magic != COMPILED_MAGIC or version != COMPILED_VERSION:
+            continue
+        if path == filename or (size, mtime) == source:
+            return digest.hex()
+    return None
+
+
+def compiled_filename(filename: str) -> str:
+    """Get the filename of the compiled version of a ``hyph_*.dic`` file."""
+    return os.path.splitext(filename)[0] + COMPILED_EXTENSION
+
+
+def _init_worker(filename: str, left: int, right: int,
+                 cache_size: Optional[int],
+                 exceptions: Dict[str, List['DataInt']], compounds: bool):
+    """Load the dictionary of a process pool worker."""
+    global worker
+    worker = Pyphen(
+        filename=filename, left=left, right=right, cache_size=cache_size,
+        compounds=compounds)
+    worker.exceptions = exceptions
+
+
+def _worker_inserted(words: List[str], hyphen: str) -> List[str]:
+    """Hyphenate a chunk of words in a process pool worker."""
+    assert worker is not None
+    return worker.inserted_many(words, hyphen)
+
+
+def split_text(chunks: Iterable[str]) -> Iterator[str]:
+    """Split text given as chunks into parts ending between words.
+
+    Words split between two chunks are kept until their end is known.
+
+    """
+    tail = ''
+    for chunk in chunks:
+        text = tail + chunk
+        end = len(text)
+        while end and word_characters.fullmatch(text[end - 1]):
+            end -= 1
+        text, tail = text[:end], text[end:]
+        if text:
+            yield text
+    if tail:
+        yield tail
+
+
 class AlternativeParser(object):
     """Parser of nonstandard hyphen pattern alternative.
 
@@ -116,24 +284,436 @@ class DataInt(int):
         return obj
 
 
+class SeparatorInt(DataInt):
+    """``DataInt`` following a separator of a compound word.
+
+    Words are split at these positions without adding a hyphen, as the first
+    part already ends with a hyphen or an apostrophe.
+
+    """
+
+
+def pack_patterns(patterns: Mapping[str, Any], maxlen: int,
+                  source: Tuple[int, int] = (0, 0), digest: str = '') -> bytes:
+    """Pack hyphenation patterns into the compiled dictionary format.
+
+    :param patterns: mapping of patterns, as stored in ``HyphDict.patterns``
+    :param maxlen: length of the longest pattern
+    :param source: size and modification time of the ``hyph_*.dic`` file
+        the patterns come from
+    :param digest: hexadecimal digest of the ``hyph_*.dic`` file, see
+        ``dictionary_key``
+
+    The patterns are stored in a trie whose nodes are numbered in
+    breadth-first order, so that the children of each node are contiguous.
+    The file is made of a header, the index of the first child of each node,
+    the reference of each node's values, the Aho-Corasick failure and output
+    links and the depth of each node, the label of each node, the values and
+    the nonstandard hyphenation alternatives.
+
+    """
+    root: List[Any] = [{}, None]
+    for key, pattern in patterns.items():
+        node = root
+        for char in key:
+            node = node[0].setdefault(char, [{}, None])
+        node[1] = pattern
+
+    first, references = array('I'), array('I')
+    labels, values, alternatives = ['\x00'], bytearray(1), []
+    queue = deque([root])
+    while queue:
+        children, pattern = queue.popleft()
+        first.append(len(labels))
+        for char in sorted(children):
+            labels.append(char)
+            queue.append(children[char])
+        if pattern is None:
+            references.append(0)
+            continue
+        start, pattern_values = pattern
+        references.append(len(values))
+        for index, value in enumerate(pattern_values):
+            if getattr(value, 'data', None):
+                change, data_index, cut = value.data
+                alternatives.append(
+                    f'{len(values)}\t{change}\t{data_index + index}\t{cut}\n')
+                break
+        values.append(start)
+        values.append(len(pattern_values))
+        values.extend(pattern_values)
+    first.append(len(labels))
+
+    # Aho-Corasick links: longest proper suffix of each node in the trie,
+    # and longest proper suffix that is a pattern
+    text = ''.join(labels)
+    fail, output = array('I', [0]) * len(labels), array('I', [0]) * len(labels)
+    depth = bytearray(len(labels))
+    for node in range(len(labels)):
+        for child in range(first[node], first[node + 1]):
+            depth[child] = depth[node] + 1
+            if node:
+                char, suffix = text[child], fail[node]
+                match = text.find(char, first[suffix], first[suffix + 1])
+                while match < 0 and suffix:
+                    suffix = fail[suffix]
+                    match = text.find(char, first[suffix], first[suffix + 1])
+                fail[child] = max(match, 0)
+            suffix = fail[child]
+            output[child] = suffix if references[suffix] else output[suffix]
+
+    labels_bytes = text.encode('utf-8')
+    alternatives_bytes = ''.join(alternatives).encode('utf-8')
+    header = compiled_header.pack(
+        COMPILED_MAGIC, byteorder, COMPILED_VERSION, len(labels),
+        len(patterns), maxlen, len(labels_bytes), len(values),
+        len(alternatives_bytes), *source, bytes.fromhex(digest))
+    return b''.join((
+        header, first.tobytes(), references.tobytes(), fail.tobytes(),
+        output.tobytes(), bytes(depth), labels_bytes, bytes(values),
+        alternatives_bytes))
+
+
+class PackedPatterns(Mapping[str, Tuple[int, Tuple[int, ...]]]):
+    """Read-only mapping of hyphenation patterns stored in a flat trie.
+
+    The trie is read from a buffer in the format written by
+    ``pack_patterns``, usually a memory-mapped compiled dictionary. Nothing
+    is parsed: keys are found by walking the trie, values are decoded when
+    they are requested.
+
+    The trie is also an Aho-Corasick automaton, used by ``matches`` to find
+    all the patterns included in a string.
+
+    """
+
+    def __init__(self, buffer: Any):
+        view = memoryview(buffer)
+        (magic, order, version, nodes, self.count, self.maxlen, labels_size,
+         values_size, alternatives_size, *source, digest) = (
+            compiled_header.unpack_from(view))
+        if magic != COMPILED_MAGIC or version != COMPILED_VERSION:
+            raise ValueError('Unsupported compiled dictionary format')
+        if order != byteorder:
+            raise ValueError('Compiled dictionary has a different byte order')
+        self.buffer = buffer
+        self.source: Tuple[int, int] = tuple(source)
+        self.digest = digest.hex()
+
+        offset = compiled_header.size
+        self.first = view[offset:offset + 4 * (nodes + 1)].cast('I')
+        offset += 4 * (nodes + 1)
+        self.references, self.fail, self.output = (
+            view[offset + 4 * nodes * i:offset + 4 * nodes * (i + 1)].cast('I')
+            for i in range(3))
+        offset += 12 * nodes
+        self.depth = view[offset:offset + nodes]
+        offset += nodes
+        self.labels = str(view[offset:offset + labels_size], 'utf-8')
+        offset += labels_size
+        self.values = view[offset:offset + values_size]
+        offset += values_size
+
+        self.alternatives: Dict[int, Tuple[int, Tuple[int, ...]]] = {}
+        lines = str(view[offset:offset + alternatives_size], 'utf-8')
+        for line in lines.splitlines():
+            reference, change, index, cut = line.split('\t')
+            start, values = self._decode(int(reference))
+            self.alternatives[int(reference)] = start, tuple(
+                DataInt(value, (change, int(index) - i, int(cut)))
+                if value & 1 else value for i, value in enumerate(values))
+
+    @classmethod
+    def open(cls, filename: str) -> 'PackedPatterns':
+        """Memory-map a compiled dictionary."""
+        with open(filename, 'rb') as stream:
+            return cls(mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ))
+
+    @classmethod
+    def find(cls, filename: str) -> Optional['PackedPatterns']:
+        """Get the compiled patterns for the given ``hyph_*.dic`` file.
+
+        ``filename`` is either a compiled dictionary, or a ``hyph_*.dic`` file
+        whose compiled version is used if it exists and is up to date.
+        Returns ``None`` if no compiled dictionary can be used.
+
+        """
+        with open(filename, 'rb') as stream:
+            if stream.read(len(COMPILED_MAGIC)) == COMPILED_MAGIC:
+                return cls.open(filename)
+            stat = os.fstat(stream.fileno())
+        try:
+            patterns = cls.open(compiled_filename(filename))
+        except (OSError, ValueError):
+            return None
+        if patterns.source == (stat.st_size, stat.st_mtime_ns):
+            return patterns
+        return None
+
+    def _decode(self, reference: int) -> Tuple[int, Tuple[int, ...]]:
+        values = self.values
+        end = reference + 2 + values[reference + 1]
+        return values[reference], tuple(values[reference + 2:end])
+
+    def _node(self, key: str) -> int:
+        first, labels = self.first, self.labels
+        node = 0
+        for char in key:
+            node = labels.find(char, first[node], first[node + 1])
+            if node < 0:
+                break
+        return node
+
+    def get(self, key: str, default: Any = None) -> Any:
+        node = self._node(key)
+        reference = self.references[node] if node >= 0 else 0
+        if not reference:
+            return default
+        return self.alternatives.get(reference) or self._decode(reference)
+
+    def matches(self, text: str, start: int = 0, stop: Optional[int] = None
+                ) -> List[Tuple[int, Tuple[int, ...]]]:
+        """Find all the patterns included in ``text``, in one pass.
+
+        :param text: unicode string where patterns are searched
+        :param start: index where the first matching pattern can start
+        :param stop: if given, index before which matching patterns start
+
+        Return a list of ``(start, (offset, values))`` tuples, sorted by start
+        and then by length of the matching patterns.
+
+        The search stops as soon as no pattern starting before ``stop`` can
+        be found anymore.
+
+        """
+        first, labels, fail = self.first, self.labels, self.fail
+        output, depth, references = self.output, self.depth, self.references
+        if stop is None:
+            stop = len(text)
+        matches = []
+        node = 0
+        for end, char in enumerate(islice(text, start, None), start + 1):
+            if end > stop and end - 1 - depth[node] >= stop:
+                # current and next matches start after stop
+                break
+            child = labels.find(char, first[node], first[node + 1])
+            while child < 0 and node:
+                node = fail[node]
+                child = labels.find(char, first[node], first[node + 1])
+            node = max(child, 0)
+            match = node if references[node] else output[node]
+            while match:
+                if end > stop and end - depth[match] >= stop:
+                    break
+                # deeper nodes have greater numbers
+                matches.append((end - depth[match], match))
+                match = output[match]
+        matches.sort()
+        alternatives, decode = self.alternatives, self._decode
+        return [
+            (start, alternatives.get(references[node]) or
+             decode(references[node]))
+            for start, node in matches]
+
+    def __getitem__(self, key: str) -> Tuple[int, Tuple[int, ...]]:
+        pattern = self.get(key)
+        if pattern is None:
+            raise KeyError(key)
+        return pattern
+
+    def __iter__(self) -> Iterator[str]:
+        first, labels, references = self.first, self.labels, self.references
+        stack = [(0, '')]
+        while stack:
+            node, key = stack.pop()
+            if references[node]:
+                yield key
+            for child in range(first[node + 1] - 1, first[node] - 1, -1):
+                stack.append((child, key + labels[child]))
+
+    def __len__(self) -> int:
+        return self.count
+
+
+class LRUCache(object):
+    """Cache keeping at most ``maxsize`` items.
+
+    When the cache is full, the least recently used item is evicted. The
+    cache is unbounded if ``maxsize`` is ``None``. The number of hits, misses
+    and evictions are counted.
+
+    The cache is thread-safe.
+
+    """
+
+    def __init__(self, maxsize: Optional[int] = None):
+        self.maxsize = maxsize
+        self.data: 'OrderedDict[Any, Any]' = OrderedDict()
+        self.hits = self.misses = self.evictions = 0
+        self.lock = threading.RLock()
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        """Get the value for ``key`` and mark it as recently used."""
+        with self.lock:
+            try:
+                value = self.data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self.data.move_to_end(key)
+            return value
+
+    def get_many(self, keys: Iterable[Any]) -> Dict[Any, Any]:
+        """Get the values of the cached ``keys``, with one lock acquisition.
+
+        Returns a ``dict`` of the keys found in the cache and their values.
+
+        """
+        data, found = self.data, {}
+        with self.lock:
+            for key in keys:
+                try:
+                    found[key] = data[key]
+                except KeyError:
+                    self.misses += 1
+                    continue
+                data.move_to_end(key)
+            self.hits += len(found)
+        return found
+
+    def update(self, items: Mapping[Any, Any]):
+        """Set many items, with one lock acquisition."""
+        with self.lock:
+            for key, value in items.items():
+                self.data[key] = value
+                self.data.move_to_end(key)
+            self._evict()
+
+    def __getitem__(self, key: Any) -> Any:
+        with self.lock:
+            value = self.data[key]
+            self.data.move_to_end(key)
+            return value
+
+    def __setitem__(self, key: Any, value: Any):
+        with self.lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            self._evict()
+
+    def __delitem__(self, key: Any):
+        with self.lock:
+            del self.data[key]
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self.data
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def _evict(self):
+        if self.maxsize is not None:
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+                self.evictions += 1
+
+    def items(self) -> List[Tuple[Any, Any]]:
+        """Get a list of the items, the least recently used first."""
+        with self.lock:
+            return list(self.data.items())
+
+    def resize(self, maxsize: Optional[int]):
+        """Change the maximum size, evicting items if needed."""
+        with self.lock:
+            self.maxsize = maxsize
+            self._evict()
+
+    def clear(self):
+        """Remove all the items and reset statistics."""
+        with self.lock:
+            self.data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def info(self) -> Dict[str, Optional[int]]:
+        """Get statistics about the cache."""
+        with self.lock:
+            return {
+                'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'size': len(self.data),
+                'maxsize': self.maxsize}
+
+
+def _shared_memory_class() -> Any:
+    """Get the class of shared memory blocks."""
+    try:
+        from multiprocessing.shared_memory import SharedMemory
+    except ImportError:
+        raise ImportError('Shared memory needs Python 3.8 or later') from None
+    return SharedMemory
+
+
 class HyphDict(object):
     """Hyphenation patterns."""
 
-    def __init__(self, filename: str):
+    # shared memory block where the patterns are stored, see ``attach``
+    shared_memory: Any = None
+
+    def __init__(self, filename: str, cache_size: Optional[int] = None,
+                 patterns: Optional[PackedPatterns] = None,
+                 compact: bool = False, compiled: bool = True):
         """Read a ``hyph_*.dic`` and parse its patterns.
 
         :param filename: filename of hyph_*.dic to read
+        :param cache_size: maximum number of words whose positions are
+            cached, ``None`` for an unbounded cache
+        :param patterns: if given, patterns already packed from the file,
+            used instead of reading it
+        :param compact: if ``True``, only keep the parsed patterns packed in
+            a ``PackedPatterns`` object instead of a ``dict``
+        :param compiled: if ``False``, always parse the ``hyph_*.dic`` file,
+            even if it has a compiled version
+
+        If ``filename`` is a compiled dictionary, or if the ``hyph_*.dic``
+        file has an up-to-date compiled version written by ``save``, the
+        patterns are memory-mapped instead of being parsed.
 
         """
-        self.patterns: Dict[str, Any] = {}
-
+        self.filename = filename
+        self.cache = LRUCache(cache_size)
+        self._patterns_size: Optional[int] = None
+        self._lock = threading.Lock()
+
+        packed = patterns
+        if packed is None and compiled:
+            packed = PackedPatterns.find(filename)
+        if packed is not None:
+            self.patterns: Mapping[str, Any] = packed
+            self.maxlen = packed.maxlen
+            self.source = packed.source
+            self.digest = packed.digest
+            self.nonstandard = bool(packed.alternatives)
+            self._trie: Optional[PackedPatterns] = packed
+            return
+
+        self.patterns = patterns = {}
+        # whether some patterns have nonstandard hyphenation alternatives
+        self.nonstandard = False
         with open(filename, 'rb') as stream:
+            stat = os.fstat(stream.fileno())
+            self.source = stat.st_size, stat.st_mtime_ns
+            # digest of the file, see ``dictionary_key``
+            sha1 = hashlib.sha1()
             # see "man 4 hunspell", iscii-devanagari is not supported by python
-            charset = stream.readline().strip().decode('ascii')
+            line = stream.readline()
+            sha1.update(line)
+            charset = line.strip().decode('ascii')
             if charset.lower() == 'microsoft-cp1251':
                 charset = 'cp1251'
-            for pattern in stream:
-                pattern = pattern.decode(charset).strip()
+            for line in stream:
+                if not line.strip().startswith((b'%', b'#')):
+                    sha1.update(line)
+                pattern = line.decode(charset).strip()
                 if not pattern or pattern.startswith((
                         '%', '#', 'LEFTHYPHENMIN', 'RIGHTHYPHENMIN',
                         'COMPOUNDLEFTHYPHENMIN', 'COMPOUNDRIGHTHYPHENMIN')):
@@ -147,6 +727,7 @@ class HyphDict(object):
                 if '/' in pattern and '=' in pattern:
                     pattern, alternative = pattern.split('/', 1)
                     factory = AlternativeParser(pattern, alternative)
+                    self.nonstandard = True
                 else:
                     factory = int
 
@@ -165,16 +746,202 @@ class HyphDict(object):
                 while not values[end - 1]:
                     end -= 1
 
-                self.patterns[''.join(
+                patterns[''.join(
                     [t if isinstance(t, str) else "" for t in tags])] = start, values[start:end]
 
-        self.cache: Dict[str, List[DataInt]] = {}
+        self.digest = sha1.hexdigest()
+        digests[(filename, *self.source)] = self.digest
         self.maxlen = max(len(key) for key in self.patterns)
+        self._trie = None
+        if compact:
+            self.patterns = self.trie
+
+    @property
+    def trie(self) -> PackedPatterns:
+        """Patterns compiled into an Aho-Corasick automaton.
+
+        The automaton is built the first time it is needed, unless the
+        patterns come from a compiled dictionary. Parsed patterns kept in a
+        ``dict`` are matched without the automaton.
+
+        """
+        if self._trie is None:
+            with self._lock:
+                if self._trie is None:
+                    self._trie = PackedPatterns(pack_patterns(
+                        self.patterns, self.maxlen, self.source,
+                        self.digest))
+            # the automaton is included in the memory budget of the cache
+            hdcache.evict()
+        return self._trie
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate size in memory of the patterns, in bytes.
+
+        Memory-mapped and shared patterns are included, as well as the
+        automaton when it is built. The words cache is not included.
+
+        """
+        if self._patterns_size is None:
+            if isinstance(self.patterns, dict):
+                try:
+                    self._patterns_size = sys.getsizeof(self.patterns) + sum(
+                        sys.getsizeof(key) + sys.getsizeof(pattern) +
+                        sys.getsizeof(pattern[1])
+                        for key, pattern in self.patterns.items())
+                except TypeError:
+                    # sizes of objects are not available on PyPy, use the
+                    # sizes of CPython objects
+                    self._patterns_size = sum(
+                        160 + len(key) + 8 * len(pattern[1])
+                        for key, pattern in self.patterns.items())
+            else:
+                self._patterns_size = 0
+        size = self._patterns_size
+        if self._trie is not None:
+            size += memoryview(self._trie.buffer).nbytes
+            try:
+                size += sys.getsizeof(self._trie.labels)
+            except TypeError:
+                size += 4 * len(self._trie.labels)
+        return size
+
+    def share(self, name: Optional[str] = None) -> Any:
+        """Copy the packed patterns into a shared memory block.
+
+        :param name: name of the shared memory block, a random name is
+            generated by default
+
+        Other processes, such as the workers of a preforking server, can use
+        the patterns with ``attach`` without copying them. The returned
+        ``multiprocessing.shared_memory.SharedMemory`` object must be kept
+        and unlinked by the caller when the patterns are not needed anymore.
+
+        Shared memory needs Python 3.8 or later.
+
+        """
+        SharedMemory = _shared_memory_class()
+        buffer = memoryview(self.trie.buffer)
+        shared_memory = SharedMemory(name, create=True, size=buffer.nbytes)
+        shared_memory.buf[:buffer.nbytes] = buffer
+        return shared_memory
+
+    @classmethod
+    def attach(cls, name: str, filename: str,
+               cache_size: Optional[int] = None) -> 'HyphDict':
+        """Use patterns stored in a shared memory block.
+
+        :param name: name of a shared memory block created by ``share``
+        :param filename: filename of hyph_*.dic the patterns come from
+        :param cache_size: maximum number of words whose positions are
+            cached, ``None`` for an unbounded cache
+
+        The patterns are read from the shared memory block, the words cache
+        is owned by the returned object.
+
+        Before Python 3.13, attached blocks are tracked by the resource
+        tracker of the process, and unlinked when it stops. The processes
+        attaching a block should then be started by the process that created
+        it, as the workers of a preforking server are, so that they share its
+        resource tracker.
+
+        Shared memory needs Python 3.8 or later.
+
+        """
+        SharedMemory = _shared_memory_class()
+        try:
+            shared_memory = SharedMemory(name, track=False)
+        except TypeError:
+            shared_memory = SharedMemory(name)
+        hd = cls(filename, cache_size, PackedPatterns(shared_memory.buf))
+        # set last, so that the block is closed after the patterns are freed
+        hd.shared_memory = shared_memory
+        return hd
+
+    def save(self, filename: Optional[str] = None) -> str:
+        """Write the patterns as a compiled dictionary.
+
+        :param filename: filename of the compiled dictionary, defaults to the
+            ``.pyphen`` file next to the ``hyph_*.dic`` file
+
+        The compiled dictionary is used instead of its ``hyph_*.dic`` file as
+        long as this file is not modified. It is replaced atomically, so that
+        processes already using the previous version are not disturbed.
+
+        Returns the filename of the compiled dictionary.
+
+        """
+        if filename is None:
+            filename = compiled_filename(self.filename)
+        data = pack_patterns(
+            self.patterns, self.maxlen, self.source, self.digest)
+        temporary = f'{filename}.{os.getpid()}.tmp'
+        with open(temporary, 'wb') as stream:
+            stream.write(data)
+        os.replace(temporary, filename)
+        return filename
+
+    def save_cache(self, filename: str):
+        """Write the cached positions of words to a file.
 
-    def positions(self, word: str) -> List[DataInt]:
+        :param filename: filename of the cache file
+
+        The cache file is replaced atomically, so that it can be saved
+        periodically while other processes load it. See also ``load_cache``.
+
+        """
+        import json
+
+        words = []
+        for key, points in self.cache.items():
+            word, window = (key, None) if isinstance(key, str) else key
+            words.append([word, window, [
+                [position, *position.data] if position.data else position
+                for position in points]])
+        temporary = f'{filename}.{os.getpid()}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as stream:
+            json.dump(
+                {'dictionary': self.digest, 'words': words},
+                stream, ensure_ascii=False, separators=(',', ':'))
+        os.replace(temporary, filename)
+
+    def load_cache(self, filename: str) -> int:
+        """Read the cached positions of words from a file.
+
+        :param filename: filename of a cache file written by ``save_cache``
+
+        The cache file is ignored if it is missing, broken, or if it has been
+        written for another version of the dictionary.
+
+        Returns the number of words added to the cache.
+
+        """
+        import json
+
+        try:
+            with open(filename, encoding='utf-8') as stream:
+                content = json.load(stream)
+            if content['dictionary'] != self.digest:
+                return 0
+            words = content['words']
+            for word, window, points in words:
+                key = word if window is None else (word, tuple(window))
+                self.cache[key] = [
+                    DataInt(point[0], tuple(point[1:]))
+                    if isinstance(point, list) else DataInt(point)
+                    for point in points]
+        except (OSError, ValueError, KeyError, TypeError):
+            return 0
+        return len(words)
+
+    def positions(self, word: str, window: Optional[Tuple[int, int]] = None
+                  ) -> List[DataInt]:
         """Get a list of positions where the word can be hyphenated.
 
         :param word: unicode string of the word to hyphenate
+        :param window: if given, the lowest and highest positions returned,
+            only the patterns changing these positions are evaluated
 
         E.g. for the dutch word 'lettergrepen' this method returns ``[3, 6,
         9]``.
@@ -198,50 +965,379 @@ class HyphDict(object):
 
         """
         word = word.lower()
-        points = self.cache.get(word)
+        key = word if window is None else (word, window)
+        points = self.cache.get(key)
         if points is None:
-            pointed_word = '.%s.' % word
-            references: List[Any] = [0] * (len(pointed_word) + 1)
-
-            for i in range(len(pointed_word) - 1):
-                for j in range(
-                        i + 1, min(i + self.maxlen, len(pointed_word)) + 1):
-                    pattern = self.patterns.get(pointed_word[i:j])
-                    if pattern:
-                        offset, values = pattern
-                        slice_ = slice(i + offset, i + offset + len(values))
-                        references[slice_] = map(
-                            max, values, references[slice_])
+            points = self.cache[key] = self._positions(word, window)
+        return points
 
+    def _positions(self, word: str, window: Optional[Tuple[int, int]]
+                   ) -> List[DataInt]:
+        """Get the positions of a lowercase word, without using the cache."""
+        pointed_word = '.%s.' % word
+        references: List[Any] = [0] * (len(pointed_word) + 1)
+
+        # no pattern starts at the final dot
+        start, stop = 0, len(pointed_word) - 1
+        if window is not None:
+            # the reference of a position is stored at the next index,
+            # patterns change the references from their start to their end
+            start = max(start, window[0] + 1 - self.maxlen)
+            stop = min(stop, window[1] + 2)
+        if isinstance(self.patterns, dict):
+            # probing parsed patterns needs no other structure in memory
+            get, matches = self.patterns.get, []
+            maxlen, length = self.maxlen, len(pointed_word)
+            for i in range(start, stop):
+                for j in range(i + 1, min(i + maxlen, length) + 1):
+                    pattern = get(pointed_word[i:j])
+                    if pattern is not None:
+                        matches.append((i, pattern))
+        else:
+            matches = self.trie.matches(pointed_word, start, stop)
+        for i, (offset, values) in matches:
+            slice_ = slice(i + offset, i + offset + len(values))
+            references[slice_] = map(max, values, references[slice_])
+
+        points = [
+            DataInt(i - 1, reference=reference)
+            for i, reference in enumerate(references) if reference % 2]
+        if window is not None:
             points = [
-                DataInt(i - 1, reference=reference)
-                for i, reference in enumerate(references) if reference % 2]
-            self.cache[word] = points
+                point for point in points if window[0] <= point <= window[1]]
         return points
 
 
+class HyphDictCache(LRUCache):
+    """Cache of ``HyphDict`` objects.
+
+    When the cache holds more than ``maxsize`` dictionaries, or when their
+    patterns use more than ``maxbytes`` bytes, the least recently used
+    dictionaries are evicted. The automata built after dictionaries are
+    added are included in the memory budget of ``hdcache``. The most recently
+    used dictionary is always kept. The cache is unbounded by default.
+
+    Evicted dictionaries are freed when they are not used by ``Pyphen``
+    objects anymore.
+
+    The cache is thread-safe, and ``load`` ensures that a dictionary is only
+    loaded once when different threads need it at the same time.
+
+    """
+
+    def __init__(self, maxsize: Optional[int] = None,
+                 maxbytes: Optional[int] = None):
+        super().__init__(maxsize)
+        self.maxbytes = maxbytes
+        self.loading: Dict[Any, Any] = {}
+
+    def load(self, key: str, factory: Callable[[], 'HyphDict']) -> 'HyphDict':
+        """Get the cached dictionary for ``key``, or load and cache it.
+
+        :param key: key of the dictionary, see ``dictionary_key``
+        :param factory: callable returning the dictionary when it is not
+            cached
+
+        When multiple threads load the same dictionary at the same time,
+        ``factory`` is only called by the first one, the other ones wait for
+        its result.
+
+        """
+        hd = self.get(key)
+        if hd is None:
+            with self.lock:
+                loading = self.loading.setdefault(key, threading.Lock())
+            with loading:
+                with self.lock:
+                    hd = self.data.get(key)
+                if hd is None:
+                    hd = self[key] = factory()
+            with self.lock:
+                self.loading.pop(key, None)
+        return hd
+
+    def load_file(self, filename: str,
+                  factory: Callable[[], 'HyphDict']) -> 'HyphDict':
+        """Get the cached dictionary for the content of a file, or load it.
+
+        :param filename: filename of the dictionary, see ``dictionary_key``
+        :param factory: callable returning the dictionary when it is not
+            cached
+
+        When the key of the file is not known without reading it, the
+        dictionary is loaded first and its digest is used as key, so that the
+        file is only read once. The loaded dictionary is then dropped if an
+        equivalent one is already cached. As with ``load``, the file is only
+        loaded by the first thread when multiple threads need it at the same
+        time.
+
+        """
+        key = dictionary_key(filename, read=False)
+        if key is not None:
+            return self.load(key, factory)
+
+        stat = os.stat(filename)
+        file_key = filename, stat.st_size, stat.st_mtime_ns
+        with self.lock:
+            loading = self.loading.setdefault(file_key, threading.Lock())
+        try:
+            with loading:
+                # the file may have been loaded while waiting for the lock
+                key = dictionary_key(filename, read=False)
+                if key is None:
+                    hd = factory()
+                    if hd.source == file_key[1:]:
+                        digests[file_key] = hd.digest
+                    return self.load(hd.digest, lambda: hd)
+        finally:
+            with self.lock:
+                self.loading.pop(file_key, None)
+        return self.load(key, factory)
+
+    def _evict(self):
+        super()._evict()
+        if self.maxbytes is not None:
+            while len(self.data) > 1 and self.nbytes > self.maxbytes:
+                self.data.popitem(last=False)
+                self.evictions += 1
+
+    def resize(self, maxsize: Optional[int], maxbytes: Any = unchanged):
+        """Change the maximum size and memory, evicting items if needed.
+
+        :param maxsize: maximum number of dictionaries, ``None`` for no limit
+        :param maxbytes: maximum memory used by the patterns, ``None`` for no
+            limit, kept unchanged if not given
+
+        """
+        with self.lock:
+            if maxbytes is not unchanged:
+                self.maxbytes = maxbytes
+            super().resize(maxsize)
+
+    def evict(self):
+        """Evict dictionaries if the cache holds too many or too large ones.
+
+        This is done each time a dictionary is added, and when the automaton
+        of a dictionary is built.
+
+        """
+        with self.lock:
+            self._evict()
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate size in memory of the cached patterns, in bytes."""
+        return sum(hd.nbytes for _, hd in self.items())
+
+    def resident(self) -> List[str]:
+        """Get the filenames of the cached dictionaries.
+
+        The filenames are sorted from the least to the most recently used.
+
+        """
+        return [hd.filename for _, hd in self.items()]
+
+
+# cache of HyphDict objects, keyed by the digest of their file
+hdcache = HyphDictCache()
+
+
+def _pack_dictionary(filename: str) -> bytes:
+    """Parse a dictionary in a process pool worker and pack its patterns."""
+    return bytes(memoryview(HyphDict(filename).trie.buffer))
+
+
+def _preload(filename: str, packed: Optional[bytes] = None) -> HyphDict:
+    """Load a dictionary and put it in the cache.
+
+    Parsed patterns are probed without building other structures, and packed
+    patterns are matched with their automaton, so that the dictionary is
+    ready to be used once loaded.
+
+    """
+    patterns = None if packed is None else PackedPatterns(packed)
+    return hdcache.load_file(
+        filename, lambda: HyphDict(filename, patterns=patterns))
+
+
+def preload(languages: Iterable[str], background: bool = True,
+            processes: Optional[int] = None) -> Dict[str, Any]:
+    """Load the dictionaries of the given languages.
+
+    :param languages: iterable of languages whose dictionaries are loaded
+    :param background: if ``True``, load the dictionaries in background
+        threads and return immediately
+    :param processes: if given, number of processes used to parse the
+        dictionaries in background, in parallel
+
+    The dictionaries are put in the cache of dictionaries, so that the
+    ``Pyphen`` objects created later for these languages don't have to parse
+    them.
+
+    When ``processes`` is given, each process parses a dictionary and packs
+    its patterns into an automaton, sent to the current process. These
+    dictionaries then keep their patterns packed, as with ``compact=True``:
+    they use less memory than parsed dictionaries, but finding the positions
+    of words not cached is slower.
+
+    Returns a ``dict`` mapping each language to a
+    ``concurrent.futures.Future`` object whose result is the ``HyphDict``
+    object, done when the dictionary is ready. These futures can be waited
+    for with ``concurrent.futures.wait``, or awaited in asyncio code after
+    being wrapped by ``asyncio.wrap_future``.
+
+    """
+    from concurrent.futures import (
+        Future, ProcessPoolExecutor, ThreadPoolExecutor)
+
+    filenames = {
+        language: LANGUAGES[language_fallback(language)]
+        for language in languages}
+    futures: Dict[str, Any] = {}
+    resident = hdcache.resident()
+
+    if not background:
+        for filename in dict.fromkeys(filenames.values()):
+            futures[filename] = Future()
+            futures[filename].set_result(_preload(filename))
+    elif processes:
+        executor: Any = ProcessPoolExecutor(processes)
+        for filename in dict.fromkeys(filenames.values()):
+            future = futures[filename] = Future()
+            if filename in resident:
+                future.set_result(_preload(filename))
+                continue
+
+            def loaded(packed: Any, filename: str = filename,
+                       future: Any = future):
+                try:
+                    future.set_result(_preload(filename, packed.result()))
+                except BaseException as exception:
+                    future.set_exception(exception)
+
+            executor.submit(_pack_dictionary, filename).add_done_callback(
+                loaded)
+        executor.shutdown(wait=False)
+    elif filenames:
+        # one thread per file, no more than processors
+        executor = ThreadPoolExecutor(
+            min(len(set(filenames.values())), os.cpu_count() or 1))
+        for filename in dict.fromkeys(filenames.values()):
+            futures[filename] = executor.submit(_preload, filename)
+        executor.shutdown(wait=False)
+
+    return {
+        language: futures[filename]
+        for language, filename in filenames.items()}
+
+
 class Pyphen(object):
     """Hyphenation class, with methods to hyphenate strings in various ways."""
 
-    def __init__(self, filename: Optional[str] = None, lang: Optional[str] = None, left: int = 2, right: int = 2, cache: bool = True):
+    def __init__(self, filename: Optional[str] = None,
+                 lang: Optional[str] = None, left: int = 2, right: int = 2,
+                 cache: bool = True, cache_size: Optional[int] = None,
+                 shared_memory: Optional[str] = None, compact: bool = False,
+                 exceptions: Iterable[str] = (), compounds: bool = False,
+                 results_size: Optional[int] = 0,
+                 widths_size: Optional[int] = 4096):
         """Create an hyphenation instance for given lang or filename.
 
         :param filename: filename of hyph_*.dic to read
         :param lang: lang of the included dict to use if no filename is given
         :param left: minimum number of characters of the first syllabe
         :param right: minimum number of characters of the last syllabe
-        :param cache: if ``True``, use cached copy of the hyphenation patterns
+        :param cache: if ``True``, use cached copy of the hyphenation patterns,
+            shared by all the files with the same content
+        :param cache_size: if given, maximum number of words cached by the
+            hyphenation patterns when they are loaded, shared with other users
+            of the cached copy; a warning is emitted and the size is kept if
+            a cached copy with another size is used
+        :param shared_memory: name of a shared memory block created by
+            ``HyphDict.share``, where the hyphenation patterns are read if
+            there is no cached copy of them, needs Python 3.8 or later
+        :param compact: if ``True``, keep the parsed hyphenation patterns
+            packed, see ``HyphDict``
+        :param exceptions: iterable of words whose hyphenation positions are
+            given by hyphens, such as ``'ta-ble'``, used instead of the
+            hyphenation patterns
+        :param compounds: if ``True``, hyphenate separately the components of
+            words including hyphens and apostrophes, see ``positions``
+        :param results_size: maximum number of results of ``inserted`` and
+            ``iterate`` cached by this instance, ``None`` for an unbounded
+            cache, ``0`` (the default) for no cache
+        :param widths_size: maximum number of words whose widths measured by
+            ``wrap`` are cached by this instance, ``None`` for an unbounded
+            cache
 
         """
         if not filename and lang:
             filename = LANGUAGES[language_fallback(lang)]
         self.left = left
         self.right = right
+        # widths of first parts measured by ``wrap``
+        self.widths = LRUCache(widths_size)
+        # results of ``inserted`` and ``iterate``, keyed by word, hyphen (or
+        # ``None`` for ``iterate``), left and right, cleared when compounds or
+        # exceptions are set
+        self.results = LRUCache(results_size)
+        self.compounds = compounds
+
+        parsed: Dict[str, List[DataInt]] = {}
+        for exception in exceptions:
+            parts = exception.strip().lower().split('-')
+            positions, position = [], 0
+            for part in parts[:-1]:
+                position += len(part)
+                positions.append(DataInt(position))
+            parsed[''.join(parts)] = positions
+        self.exceptions = parsed
 
         if filename:
-            if not cache or filename not in hdcache:
-                hdcache[filename] = HyphDict(filename)
-            self.hd = hdcache[filename]
+            def load() -> HyphDict:
+                if shared_memory:
+                    return HyphDict.attach(shared_memory, filename, cache_size)
+                return HyphDict(filename, cache_size, compact=compact)
+
+            if cache:
+                self.hd = hdcache.load_file(filename, load)
+            else:
+                self.hd = load()
+                hdcache[self.hd.digest] = self.hd
+            if cache_size is not None and cache_size != self.hd.cache.maxsize:
+                # the words cache is shared by all the users of the cached
+                # dictionary, its size is not changed by other users
+                warnings.warn(
+                    f'cache_size={cache_size} is ignored, the cached '
+                    f'dictionary keeps {self.hd.cache.maxsize} words; use '
+                    'cache=False or resize hd.cache', stacklevel=2)
+
+    @property
+    def compounds(self) -> bool:
+        """Whether the components of compound words are hyphenated apart."""
+        return self._compounds
+
+    @compounds.setter
+    def compounds(self, compounds: bool):
+        self._compounds = compounds
+        self.results.clear()
+        self.widths.clear()
+
+    @property
+    def exceptions(self) -> Dict[str, List[DataInt]]:
+        """Positions of the exceptions, keyed by lowercase word.
+
+        The cached results are cleared when new exceptions are set. Set a new
+        ``dict`` instead of changing this one.
+
+        """
+        return self._exceptions
+
+    @exceptions.setter
+    def exceptions(self, exceptions: Dict[str, List[DataInt]]):
+        self._exceptions = exceptions
+        self.results.clear()
+        self.widths.clear()
 
     def positions(self, word: str):
         """Get a list of positions where the word can be hyphenated.
@@ -251,45 +1347,322 @@ class Pyphen(object):
         See also ``HyphDict.positions``. The points that are too far to the
         left or right are removed.
 
+        The positions of words in the exceptions are found without using the
+        hyphenation patterns.
+
+        In compound mode, words such as ``'state-of-the-art'`` are split at
+        their hyphens and apostrophes. Each component is hyphenated and cached
+        on its own, and the points too far to the left or right of each
+        component are removed.
+
         """
-        right = len(word) - self.right
-        return [i for i in self.hd.positions(word) if self.left <= i <= right]
+        if self.compounds and compound_separators.search(word):
+            positions, start = [], 0
+            for component in compound_separators.split(word):
+                positions.extend(
+                    DataInt(start + position, reference=position)
+                    for position in self._positions(component))
+                start += len(component) + 1
+            return positions
+        return self._positions(word)
+
+    def _split_positions(self, word: str) -> List[DataInt]:
+        """Get the positions where the word can be split.
+
+        In compound mode, the positions following the separators between the
+        components are included as ``SeparatorInt`` objects.
+
+        """
+        positions = self.positions(word)
+        if self.compounds:
+            separators = [
+                SeparatorInt(match.end())
+                for match in compound_breaks.finditer(word)]
+            if separators:
+                positions = sorted(positions + separators)
+        return positions
+
+    def _positions(self, word: str) -> List[DataInt]:
+        """Get the positions of a word, without splitting compounds."""
+        if self.exceptions:
+            points = self.exceptions.get(word.lower())
+            if points is not None:
+                right = len(word) - self.right
+                return [i for i in points if self.left <= i <= right]
+        # copy the cached list, so that callers can't change the cache
+        return list(
+            self.hd.positions(word, (self.left, len(word) - self.right)))
 
     def iterate(self, word: str):
         """Iterate over all hyphenation possibilities, the longest first.
 
         :param word: unicode string of the word to hyphenate
 
-        """
-        for position in reversed(self.positions(word)):
-            if position.data:
-                # get the nonstandard hyphenation data
-                change, index, cut = position.data
-                index += position
-                if word.isupper():
-                    change = change.upper()
-                c1, c2 = change.split('=')
-                yield word[:index] + c1, c2 + word[index + cut:]
-            else:
-                yield word[:position], word[position:]
+        In compound mode, the word is also split after its hyphens and
+        apostrophes, the first part keeping them.
+
+        The possibilities of recently hyphenated words are cached if
+        ``results_size`` is not ``0``.
 
-    def wrap(self, word: str, width: int, hyphen: str = '-'):
+        """
+        if self.results.maxsize == 0:
+            return iter([
+                self._split(word, position)
+                for position in reversed(self._split_positions(word))])
+        key = word, None, self.left, self.right
+        splits = self.results.get(key)
+        if splits is None:
+            splits = self.results[key] = tuple(
+                self._split(word, position)
+                for position in reversed(self._split_positions(word)))
+        return iter(splits)
+
+    def _split(self, word: str, position: DataInt) -> Tuple[str, str]:
+        """Split the word at the given hyphenation position."""
+        if position.data:
+            # get the nonstandard hyphenation data
+            change, index, cut = position.data
+            index += position
+            if word.isupper():
+                change = change.upper()
+            c1, c2 = change.split('=')
+            return word[:index] + c1, c2 + word[index + cut:]
+        return word[:position], word[position:]
+
+    def _hyphenate(self, word: str, position: DataInt,
+                   hyphen: str) -> Tuple[str, str]:
+        """Split the word at the given position and attach the hyphen."""
+        w1, w2 = self._split(word, position)
+        if not isinstance(position, SeparatorInt):
+            w1 += hyphen
+        return w1, w2
+
+    def wrap(self, word: str, width: float, hyphen: str = '-',
+             measure: Optional[Callable[[str], float]] = None):
         """Get the longest possible first part and the last part of a word.
 
         :param word: unicode string of the word to hyphenate
-        :param width: maximum length of the first part
+        :param width: maximum width of the first part
         :param hyphen: unicode string used as hyphen character
+        :param measure: function giving the width of a string, in the same
+            unit as ``width``, the length of the string by default
 
-        The first part has the hyphen already attached.
+        The first part has the hyphen already attached. In compound mode,
+        words can also be split after their hyphens and apostrophes, without
+        adding another hyphen.
 
         Returns ``None`` if there is no hyphenation point before ``width``, or
         if the word could not be hyphenated.
 
+        The cached positions of the word are used when they are available.
+        Otherwise, only the patterns changing positions before ``width`` are
+        evaluated, and these partial positions are not cached.
+
+        When ``measure`` is given, the widths of the first parts must grow with
+        their length. The longest first part that fits is found by a binary
+        search, and the measured widths are cached for each word, hyphen,
+        ``measure`` function, ``left`` and ``right``. Widths are never found
+        in the cache when a new function, such as a new ``lambda``, is given
+        for each call.
+
         """
-        width -= len(hyphen)
-        for w1, w2 in self.iterate(word):
+        if measure is not None:
+            positions = self._split_positions(word)
+            # widths are stored by index in positions, that depend on left
+            # and right
+            key = word, hyphen, measure, self.left, self.right
+            widths = self.widths.get(key)
+            if widths is None:
+                widths = self.widths[key] = {}
+            # number of first parts that fit
+            low, high = 0, len(positions)
+            while low < high:
+                middle = (low + high) // 2
+                if middle not in widths:
+                    w1, _ = self._hyphenate(word, positions[middle], hyphen)
+                    widths[middle] = measure(w1)
+                if widths[middle] <= width:
+                    low = middle + 1
+                else:
+                    high = middle
+            if low:
+                return self._hyphenate(word, positions[low - 1], hyphen)
+            return
+
+        window = (self.left, len(word) - self.right)
+        limit = width - len(hyphen)
+        lower_word = word.lower()
+        if lower_word in self.exceptions or self.hd.nonstandard or (
+                self.compounds and compound_separators.search(word)) or (
+                # infinite and NaN widths don't limit positions
+                not limit < window[1]) or (
+                (lower_word, window) in self.hd.cache):
+            positions = self._split_positions(word)
+        else:
+            # without nonstandard hyphenation, first parts are as long as
+            # positions, further positions are useless
+            positions = self.hd._positions(
+                lower_word, (window[0], math.floor(limit)))
+        for position in reversed(positions):
+            w1, w2 = self._hyphenate(word, position, hyphen)
             if len(w1) <= width:
-                return w1 + hyphen, w2
+                return w1, w2
+
+    def _breaks(self, token: str,
+                hyphen: str) -> List[Tuple[str, str, int]]:
+        """Get the hyphenation possibilities of a token, the shortest first.
+
+        Each possibility is given as the first part with the hyphen attached,
+        the last part and the number of characters of the token kept in the
+        first part.
+
+        In compound mode, the token can also be split after the separators
+        between its components, without adding a hyphen.
+
+        """
+        breaks = []
+        for match in word_characters.finditer(token):
+            start, end = match.span()
+            word = match.group()
+            for position in self.positions(word):
+                w1, w2 = self._hyphenate(word, position, hyphen)
+                index = position + position.data[1] if position.data else (
+                    position)
+                breaks.append(
+                    (token[:start] + w1, w2 + token[end:], start + index))
+        if self.compounds:
+            for match in compound_breaks.finditer(token):
+                index = match.end()
+                breaks.append((token[:index], token[index:], index))
+            breaks.sort(key=lambda possibility: possibility[2])
+        return breaks
+
+    def paragraph(self, text: str, width: float,
+                  measure: Callable[[str], float] = len, hyphen: str = '-',
+                  hyphen_penalty: float = 50) -> List[str]:
+        """Break a paragraph into lines, with optimal hyphenation.
+
+        :param text: unicode string of the paragraph
+        :param width: maximum width of the lines
+        :param measure: function giving the width of a string, in the same
+            unit as ``width``, its length by default
+        :param hyphen: unicode string used as hyphen character
+        :param hyphen_penalty: penalty of the lines ending with a hyphen
+
+        Words are separated by white space. Lines are chosen to minimize the
+        total demerits of the paragraph, as in Knuth and Plass' algorithm:
+        each line whose spaces have to be stretched is penalized, the last line
+        is free. Lines are only longer than ``width`` when a part of a word
+        doesn't fit. In compound mode, lines can also end after the hyphens
+        and apostrophes of words, without adding a hyphen.
+
+        The hyphenation possibilities of each different word are found once,
+        each part of a word is measured once and the width of a line is
+        computed from the widths of its parts, so ``measure`` must be additive.
+        Only the breaks fitting on a line are compared, so that the layout
+        time grows linearly with the number of words.
+
+        Returns the list of the lines, with hyphens attached.
+
+        """
+        words = text.split()
+        if not words:
+            return []
+        space = measure(' ')
+        widths = {}
+        possibilities: Dict[str, List[Tuple[str, str, int, float, float]]] = {}
+        for word in words:
+            if word not in possibilities:
+                widths[word] = measure(word)
+                possibilities[word] = [
+                    (w1, w2, index, measure(w1), measure(w2))
+                    for w1, w2, index in self._breaks(word, hyphen)]
+        prefix = [0.]
+        for word in words:
+            prefix.append(prefix[-1] + widths[word])
+
+        # breaks are tuples of the word where the next line starts, the width
+        # of its part on the next line, the width of the last word part of the
+        # line, and the possibility where a word is hyphenated
+        breaks: List[Tuple[int, float, float, Any]] = [
+            (0, widths[words[0]], 0, None)]
+        for i, word in enumerate(words):
+            for possibility in possibilities[word]:
+                breaks.append((i, possibility[4], possibility[3], possibility))
+            if i + 1 < len(words):
+                breaks.append(
+                    (i + 1, widths[words[i + 1]], widths[word], None))
+        breaks.append((len(words), 0, widths[words[-1]], None))
+        last = len(breaks) - 1
+
+        demerits = [0.] + [float('inf')] * last
+        previous = [0] * len(breaks)
+        active = [0]
+        for j in range(1, len(breaks)):
+            end_word, _, end_width, possibility = breaks[j]
+            if possibility is None:
+                end_word -= 1
+            still_active, overfull = [], None
+            for i in active:
+                start_word, start_width = breaks[i][:2]
+                line_width = (
+                    prefix[end_word] - prefix[start_word] + end_width +
+                    start_width - widths[words[start_word]] +
+                    space * (end_word - start_word))
+                slack = width - line_width
+                if slack < 0:
+                    overfull = i
+                    if possibility is None:
+                        # lines ending between words only get longer, this
+                        # break is not needed anymore
+                        continue
+                    # hyphenated first parts may be wider than whole words
+                    still_active.append(i)
+                    continue
+                still_active.append(i)
+                if j == last:
+                    badness = 0.
+                elif end_word > start_word:
+                    ratio = 2 * slack / (space * (end_word - start_word))
+                    badness = min(100 * ratio ** 3, 10000)
+                else:
+                    badness = 10000 if slack else 0
+                cost = demerits[i] + (10 + badness) ** 2
+                if possibility is not None:
+                    cost += hyphen_penalty ** 2
+                if cost < demerits[j]:
+                    demerits[j], previous[j] = cost, i
+            if demerits[j] == float('inf') and overfull is not None:
+                # nothing fits, keep the shortest overfull line, worse than
+                # any line that fits
+                demerits[j] = demerits[overfull] + 10010 ** 3
+                previous[j] = overfull
+            active = still_active
+            if demerits[j] < float('inf'):
+                active.append(j)
+
+        lines = []
+        j = last
+        while j:
+            i = previous[j]
+            start_word, _, _, start = breaks[i]
+            end_word, _, _, end = breaks[j]
+            if end is None:
+                end_word -= 1
+            parts = words[start_word:end_word + 1]
+            if start is not None:
+                parts[0] = start[1]
+            if end is not None:
+                if start is not None and start_word == end_word:
+                    # both ends of the line are in the same word
+                    cut = len(start[1]) - len(words[end_word]) + end[2]
+                    parts[-1] = start[1][:cut] + end[0][end[2]:]
+                else:
+                    parts[-1] = end[0]
+            lines.append(' '.join(parts))
+            j = i
+        lines.reverse()
+        return lines
 
     def inserted(self, word: str, hyphen: str = '-'):
         """Get the word as a string with all the possible hyphens inserted.
@@ -301,9 +1674,30 @@ class Pyphen(object):
         unicode string ``'let-ter-gre-pen'``. The hyphen string to use can be
         given as the second parameter, that defaults to ``'-'``.
 
+        If ``results_size`` is not ``0``, the hyphenated strings of recently
+        hyphenated words are cached, so that hyphenating them again only needs
+        a cache lookup.
+
         """
+        if self.results.maxsize == 0:
+            return self._inserted(word, self.positions(word), hyphen)
+        key = word, hyphen, self.left, self.right
+        result = self.results.get(key)
+        if result is None:
+            result = self.results[key] = self._inserted(
+                word, self.positions(word), hyphen)
+        return result
+
+    @staticmethod
+    def _inserted(word: str, positions: List[DataInt], hyphen: str) -> str:
+        """Insert hyphens in a word at the given positions."""
+        if not any(position.data for position in positions):
+            ends = positions + [len(word)]
+            return hyphen.join(
+                word[start:end] for start, end in zip([0] + positions, ends))
+
         word_list = list(word)
-        for position in reversed(self.positions(word)):
+        for position in reversed(positions):
             if position.data:
                 # get the nonstandard hyphenation data
                 change, index, cut = position.data
@@ -313,7 +1707,224 @@ class Pyphen(object):
                 word_list[index:index + cut] = change.replace('=', hyphen)
             else:
                 word_list.insert(position, hyphen)
-
         return ''.join(word_list)
 
+    def inserted_text(self, text: str, hyphen: str = '-') -> str:
+        """Get the text with all the possible hyphens inserted in its words.
+
+        :param text: unicode string of the text to hyphenate
+        :param hyphen: unicode string used as hyphen character
+
+        See also ``inserted``.
+
+        """
+        return word_characters.sub(
+            lambda match: self.inserted(match.group(), hyphen), text)
+
+    def inserted_stream(self, chunks: Any, hyphen: str = '-',
+                        size: int = 65536) -> Iterator[str]:
+        """Hyphenate a text given as chunks, chunk by chunk.
+
+        :param chunks: iterable of unicode strings, or file object opened in
+            text mode
+        :param hyphen: unicode string used as hyphen character
+        :param size: size of the chunks read from file objects
+
+        The hyphenated text is yielded chunk by chunk, so that the memory
+        needed doesn't depend on the size of the text. Words split between
+        two chunks are kept until their end is known. See also
+        ``inserted_text``.
+
+        """
+        if hasattr(chunks, 'read'):
+            chunks = iter(partial(chunks.read, size), '')
+        for text in split_text(chunks):
+            yield self.inserted_text(text, hyphen)
+
+    def inserted_html(self, chunks: Any, hyphen: str = '\u00ad',
+                      size: int = 65536) -> Iterator[str]:
+        """Hyphenate an HTML or XML document given as chunks, chunk by chunk.
+
+        :param chunks: iterable of unicode strings, or file object opened in
+            text mode
+        :param hyphen: unicode string inserted as hyphen, the soft hyphen
+            character by default, valid in both HTML and XML
+        :param size: size of the chunks read from file objects
+
+        The document is parsed in one pass by ``html.parser``. Hyphens are
+        only inserted in text: markup, attribute values, character references
+        and the content of ``pre``, ``code``, ``script``, ``style``,
+        ``textarea`` and ``title`` elements are kept as they are. Words are
+        hyphenated with ``inserted_text``, so that the positions of repeated
+        words are read from the cache of the dictionary. Words including
+        character references, such as ``'Stra&szlig;e'``, are hyphenated as
+        their decoded text. See also ``inserted_stream``.
+
+        """
+        from .markup import HyphenationParser
+
+        if hasattr(chunks, 'read'):
+            chunks = iter(partial(chunks.read, size), '')
+        parser = HyphenationParser(self, hyphen)
+        for chunk in chunks:
+            parser.feed(chunk)
+            if parser.output:
+                yield ''.join(parser.output)
+                parser.output.clear()
+        parser.close()
+        if parser.output:
+            yield ''.join(parser.output)
+
+    async def ainserted_text(self, text: str, hyphen: str = '-',
+                             size: int = 4096, executor: Any = None) -> str:
+        """Get the text with all the possible hyphens inserted, in an executor.
+
+        :param text: unicode string of the text to hyphenate
+        :param hyphen: unicode string used as hyphen character
+        :param size: approximate size of the slices of text hyphenated at once
+        :param executor: ``concurrent.futures`` executor used to hyphenate the
+            slices, the default executor of the event loop by default
+
+        The text is split into slices, hyphenated one after the other, so that
+        the event loop regularly regains control. See also ``inserted_text``.
+
+        """
+        import asyncio
+
+        loop = asyncio.get_event_loop()
+        chunks = (text[i:i + size] for i in range(0, len(text), size))
+        parts = []
+        for part in split_text(chunks):
+            parts.append(await loop.run_in_executor(
+                executor, self.inserted_text, part, hyphen))
+        return ''.join(parts)
+
+    @classmethod
+    async def aload(cls, *args: Any, executor: Any = None,
+                    **kwargs: Any) -> 'Pyphen':
+        """Create an hyphenation instance, in an executor.
+
+        :param executor: ``concurrent.futures`` executor used to load the
+            dictionary, the default executor of the event loop by default
+
+        Other arguments are given to ``Pyphen``. The dictionary is loaded
+        without blocking the event loop.
+
+        """
+        import asyncio
+
+        return await asyncio.get_event_loop().run_in_executor(
+            executor, partial(cls, *args, **kwargs))
+
+    def _positions_many(self, words: Iterable[str]
+                        ) -> Dict[str, List[DataInt]]:
+        """Get the positions of different words, keyed by word.
+
+        The returned lists may be the lists stored in the cache of the
+        dictionary, they must not be changed.
+
+        """
+        left, right, hd = self.left, self.right, self.hd
+        exceptions, compounds = self.exceptions, self.compounds
+        results: Dict[str, List[DataInt]] = {}
+        words = list(words)
+        # cache keys of the words, shared by case variants, with one window
+        # object per word length
+        windows = [
+            (left, length - right)
+            for length in range(max(map(len, words), default=0) + 1)]
+        keys = {word: (word.lower(), windows[len(word)]) for word in words}
+        if exceptions or compounds:
+            for word, (lower, _) in list(keys.items()):
+                if lower in exceptions or (
+                        compounds and compound_separators.search(word)):
+                    results[word] = self.positions(word)
+                    del keys[word]
+
+        unique = dict.fromkeys(keys.values())
+        points = hd.cache.get_many(unique)
+        if len(points) < len(unique):
+            missing = {
+                key: hd._positions(*key)
+                for key in unique if key not in points}
+            hd.cache.update(missing)
+            points.update(missing)
+        results.update({word: points[key] for word, key in keys.items()})
+        return results
+
+    def positions_many(self, words: Iterable[str]) -> List[List[DataInt]]:
+        """Get the lists of positions where many words can be hyphenated.
+
+        :param words: iterable of unicode strings of the words to hyphenate
+
+        The lists are returned in the order of ``words``. Each different word
+        is only hyphenated once, case variants of a word share their cache
+        lookup, and the cache of the dictionary is only locked twice. See also
+        ``positions``.
+
+        """
+        words = list(words)
+        results = self._positions_many(dict.fromkeys(words))
+        return list(map(list, map(results.__getitem__, words)))
+
+    def inserted_many(self, words: Iterable[str],
+                      hyphen: str = '-') -> List[str]:
+        """Get many words as strings with all the possible hyphens inserted.
+
+        :param words: iterable of unicode strings of the words to hyphenate
+        :param hyphen: unicode string used as hyphen character
+
+        The strings are returned in the order of ``words``, each different
+        word is only hyphenated once. The positions are found as in
+        ``positions_many``, without using the cache of results of
+        ``inserted``. See also ``inserted``.
+
+        """
+        words = list(words)
+        inserted = self._inserted
+        results = {
+            word: inserted(word, positions, hyphen)
+            for word, positions in self._positions_many(
+                dict.fromkeys(words)).items()}
+        return list(map(results.__getitem__, words))
+
+    def inserted_parallel(self, words: Iterable[str], hyphen: str = '-',
+                          processes: Optional[int] = None,
+                          chunksize: int = 10000) -> Iterator[str]:
+        """Hyphenate many words using a pool of processes.
+
+        :param words: iterable of unicode strings of the words to hyphenate
+        :param hyphen: unicode string used as hyphen character
+        :param processes: number of worker processes, defaults to the number
+            of processors
+        :param chunksize: number of words sent at once to a worker
+
+        Each worker loads the dictionary once. The words are read lazily and
+        only a few chunks per worker are processed at the same time, so that
+        iterables of any size can be hyphenated. The hyphenated words are
+        yielded in the order of ``words``. See also ``inserted_many``.
+
+        """
+        from concurrent.futures import ProcessPoolExecutor
+
+        words = iter(words)
+        processes = processes or os.cpu_count() or 1
+        arguments = (
+            self.hd.filename, self.left, self.right, self.hd.cache.maxsize,
+            self.exceptions, self.compounds)
+        with ProcessPoolExecutor(
+                processes, initializer=_init_worker,
+                initargs=arguments) as executor:
+            pending: Any = deque()
+            while True:
+                while len(pending) < 2 * processes:
+                    chunk = list(islice(words, chunksize))
+                    if not chunk:
+                        break
+                    pending.append(
+                        executor.submit(_worker_inserted, chunk, hyphen))
+                if not pending:
+                    break
+                yield from pending.popleft().result()
+
     __call__ = iterate
@@ -0,0 +1,97 @@
+# This file is part of Pyphen
+#
+# This library is free software.  It is released under the
+# GPL 2.0+/LGPL 2.1+/MPL 1.1 tri-license.  See COPYING.GPL, COPYING.LGPL and
+# COPYING.MPL for more details.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+
+"""
+
+Pyphen command-line interface
+=============================
+
+Compile the included dictionaries with ``python -m pyphen compile``, so that
+they are memory-mapped instead of being parsed when they are loaded.
+
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import List, Optional
+
+from . import LANGUAGES, HyphDict, compiled_filename, language_fallback
+
+
+def compile_dictionaries(languages: List[str],
+                         output: Optional[str] = None) -> List[str]:
+    """Compile the dictionaries of the given languages.
+
+    :param languages: languages whose dictionaries are compiled, all the
+        included dictionaries if empty
+    :param output: folder where compiled dictionaries are written, defaults
+        to the folder of each ``hyph_*.dic`` file
+
+    Parse time, number of patterns and size of each compiled dictionary are
+    printed.
+
+    Returns the list of the compiled dictionaries filenames.
+
+    """
+    if languages:
+        filenames = [
+            LANGUAGES[language_fallback(language)] for language in languages]
+    else:
+        filenames = list(LANGUAGES.values())
+
+    compiled = []
+    for filename in dict.fromkeys(filenames):
+        start = time.perf_counter()
+        hd = HyphDict(filename, compiled=False)
+        parse_time = time.perf_counter() - start
+        target = compiled_filename(filename)
+        if output is not None:
+            target = os.path.join(output, os.path.basename(target))
+        hd.save(target)
+        print(
+            f'{os.path.basename(filename)}: {len(hd.patterns)} patterns, '
+            f'parsed in {parse_time:.3f} s, '
+            f'{os.path.getsize(target) / 1024:.0f} KiB compiled')
+        compiled.append(target)
+    return compiled
+
+
+def main(argv: Optional[List[str]] = None):
+    """Run the command-line interface."""
+    parser = argparse.ArgumentParser(
+        prog='pyphen', description='Pure Python module to hyphenate text.')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    compile_parser = subparsers.add_parser(
+        'compile', help='compile included dictionaries',
+        description=(
+            'Compile included dictionaries, so that they are memory-mapped '
+            'instead of being parsed when they are loaded.'))
+    compile_parser.add_argument(
+        'languages', nargs='*', metavar='language',
+        help='language of the dictionary to compile, all by default')
+    compile_parser.add_argument(
+        '-o', '--output',
+        help='folder of the compiled dictionaries, next to the dictionaries '
+        'by default, where they are automatically used')
+
+    args = parser.parse_args(argv)
+    try:
+        compile_dictionaries(args.languages, args.output)
+    except KeyError as exception:
+        sys.exit(f'pyphen: {exception.args[0]}')
+
+
+if __name__ == '__main__':  # pragma: no cover
+    main()
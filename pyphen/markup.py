@@ -0,0 +1,198 @@
+# This file is part of Pyphen
+#
+# This library is free software.  It is released under the
+# GPL 2.0+/LGPL 2.1+/MPL 1.1 tri-license.  See COPYING.GPL, COPYING.LGPL and
+# COPYING.MPL for more details.
+#
+# This library is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+
+"""
+
+Pyphen markup filter
+====================
+
+Insert hyphens in the text of HTML and XML documents, see
+``Pyphen.inserted_html``.
+
+"""
+
+from html import unescape
+from html.parser import HTMLParser
+from typing import Any, List, Tuple
+
+from . import word_characters
+
+# elements whose text is not hyphenated
+SKIPPED_TAGS = frozenset(
+    ('pre', 'code', 'script', 'style', 'textarea', 'title'))
+
+# decoded text of the references that can't be decoded, not part of words
+UNKNOWN_REFERENCE = '\ufffc'
+
+
+class HyphenationParser(HTMLParser):
+    """Parser copying a document, with hyphens inserted in its text.
+
+    Markup, including attribute values, character references and the text of
+    skipped elements, is copied as it is. The copied document is added to
+    ``output`` while it is fed to the parser.
+
+    Words including character references are hyphenated as their decoded
+    text, hyphens are never inserted inside references.
+
+    """
+
+    def __init__(self, pyphen: Any, hyphen: str = '\u00ad'):
+        super().__init__(convert_charrefs=False)
+        self.pyphen = pyphen
+        self.hyphen = hyphen
+        self.output: List[str] = []
+        # raw and decoded parts of the text whose last word may continue in
+        # the next fed data
+        self.pending: List[Tuple[str, str]] = []
+        self.skipped = 0
+        self.text = self.reference = False
+
+    def flush(self, end: bool = True):
+        """Add the hyphenated pending text to the output.
+
+        :param end: if ``False``, keep the last word of the pending text, as
+            it may continue in the next fed data
+
+        """
+        pending = self.pending
+        text = ''.join(decoded for _, decoded in pending)
+        index = length = len(text)
+        if not end:
+            while index and word_characters.fullmatch(text[index - 1]):
+                index -= 1
+        kept: List[Tuple[str, str]] = []
+        while length > index:
+            raw, decoded = pending.pop()
+            length -= len(decoded)
+            if length < index and raw == decoded:
+                # split data, references are kept whole
+                cut = index - length
+                pending.append((raw[:cut], decoded[:cut]))
+                raw = decoded = decoded[cut:]
+            kept.insert(0, (raw, decoded))
+        if pending:
+            self.output.append(self.hyphenated(pending))
+        self.pending = kept
+
+    def hyphenated(self, parts: List[Tuple[str, str]]) -> str:
+        """Get the raw text of the given parts, with hyphens inserted.
+
+        :param parts: list of raw strings and their decoded text
+
+        """
+        if all(raw == decoded for raw, decoded in parts):
+            return self.pyphen.inserted_text(
+                ''.join(raw for raw, _ in parts), self.hyphen)
+
+        # raw strings of the decoded characters, the raw string of each
+        # reference is given to its first character
+        text, raws = '', []
+        for raw, decoded in parts:
+            text += decoded
+            if raw == decoded:
+                raws.extend(decoded)
+            else:
+                raws.extend([raw] + [''] * (len(decoded) - 1))
+
+        output, last = [], 0
+        for match in word_characters.finditer(text):
+            start, end = match.span()
+            output.extend(raws[last:start])
+            output.append(self.inserted(match.group(), raws[start:end]))
+            last = end
+        output.extend(raws[last:])
+        return ''.join(output)
+
+    def inserted(self, word: str, raws: List[str]) -> str:
+        """Get the raw string of a word, with hyphens inserted.
+
+        :param word: decoded word
+        :param raws: raw strings of the characters of the word
+
+        """
+        if ''.join(raws) == word:
+            return self.pyphen.inserted(word, self.hyphen)
+        parts = list(raws)
+        for position in reversed(self.pyphen.positions(word)):
+            if position.data:
+                # nonstandard hyphenation, unless references are changed
+                change, index, cut = position.data
+                index += position
+                if any(raw != character for raw, character in zip(
+                        raws[index:index + cut], word[index:index + cut])):
+                    continue
+                if word.isupper():
+                    change = change.upper()
+                parts[index:index + cut] = [change.replace('=', self.hyphen)]
+            elif position >= len(raws) or raws[position]:
+                # hyphens can't be inserted inside references
+                parts.insert(position, self.hyphen)
+        return ''.join(parts)
+
+    def updatepos(self, i: int, j: int) -> int:
+        # ``updatepos`` is an undocumented method of
+        # ``_markupbase.ParserBase``, called by ``HTMLParser.goahead`` after
+        # the handler of each part of the document, with the bounds of the
+        # part in ``rawdata``. ``test_inserted_html_copy`` checks that each
+        # part of various documents is copied, and ``check`` raises an error
+        # if a part is not followed by a call of this method.
+        if i < j:
+            raw = self.rawdata[i:j]
+            if (self.text or self.reference) and not self.skipped:
+                decoded = raw
+                if self.reference:
+                    decoded = unescape(raw)
+                    if decoded == raw or not decoded:
+                        decoded = UNKNOWN_REFERENCE
+                self.pending.append((raw, decoded))
+                self.flush(end=False)
+            else:
+                self.flush()
+                self.output.append(raw)
+        self.text = self.reference = False
+        return super().updatepos(i, j)
+
+    def check(self):
+        """Raise an error if the last part was not given to ``updatepos``."""
+        if self.text or self.reference:
+            raise RuntimeError(
+                'HTMLParser.updatepos is not called after each part anymore, '
+                'inserted_html is not supported by this version of Python')
+
+    def handle_data(self, data: str):
+        self.check()
+        self.text = True
+
+    def handle_charref(self, name: str):
+        self.check()
+        self.reference = True
+
+    def handle_entityref(self, name: str):
+        self.check()
+        self.reference = True
+
+    def handle_starttag(self, tag: str, attrs: Any):
+        if tag in SKIPPED_TAGS:
+            self.skipped += 1
+
+    def handle_endtag(self, tag: str):
+        if tag in SKIPPED_TAGS and self.skipped:
+            self.skipped -= 1
+
+    def close(self):
+        super().close()
+        self.check()
+        # unclosed script and style elements are not parsed
+        self.flush()
+        if self.rawdata:
+            self.output.append(self.rawdata)
+            self.rawdata = ''
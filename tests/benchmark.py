@@ -0,0 +1,199 @@
+"""
+
+Benchmark of the included dictionaries
+======================================
+
+Measure, for each dictionary included in ``LANGUAGES``, the time needed to
+parse, compile and load it, its memory footprint, and the throughput of the
+main hyphenation methods on a fixed list of words.
+
+Run ``python -m tests.benchmark`` from the root of the repository. Results are
+printed as JSON, so that results of different releases can be compared. No
+network access is needed: words are built from the patterns of each
+dictionary with a seeded random generator.
+
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+import pyphen
+
+
+def words_of(hd: pyphen.HyphDict, number: int, seed: int = 0) -> List[str]:
+    """Build a fixed list of words from the patterns of a dictionary.
+
+    :param hd: dictionary whose patterns are used
+    :param number: number of words
+    :param seed: seed of the random generator
+
+    Words are made of consecutive pattern letters, so that they use the
+    alphabet of the dictionary and match many of its patterns.
+
+    """
+    generator = random.Random(seed)
+    keys = sorted(key.strip('.') for key in hd.patterns)
+    keys = [key for key in keys if key.isalpha()] or ['hyphenation']
+    words = []
+    for _ in range(number):
+        word, length = '', generator.randint(4, 16)
+        while len(word) < length:
+            word += generator.choice(keys)
+        words.append(word[:length])
+    return words
+
+
+def timed(function: Callable[[], Any], repeat: int) -> float:
+    """Get the best time of ``repeat`` calls of ``function``, in seconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def benchmark(filename: str, number: int = 2000,
+              repeat: int = 3) -> Dict[str, Any]:
+    """Benchmark the dictionary stored in ``filename``.
+
+    :param filename: filename of hyph_*.dic to benchmark
+    :param number: number of words hyphenated
+    :param repeat: number of runs of each measure, the best one is kept
+
+    Times are given in seconds, throughputs in words per second and sizes in
+    bytes. ``inserted`` is measured with an empty ``Pyphen.results`` cache,
+    ``inserted_cached`` with all the words already in it.
+
+    ``nbytes`` is the size of the parsed patterns, used to find positions
+    without other structure. ``positions_packed`` is measured with the
+    packed patterns of a compiled dictionary, as used by compiled, compact
+    and shared dictionaries.
+
+    """
+    parse_time = timed(
+        lambda: pyphen.HyphDict(filename, compiled=False), repeat)
+
+    gc.collect()
+    tracemalloc.start()
+    hd = pyphen.HyphDict(filename, compiled=False)
+    parse_memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    words = words_of(hd, number)
+    dic = pyphen.Pyphen(results_size=None)
+    dic.hd = hd
+
+    def cold():
+        hd.cache.clear()
+        for word in words:
+            dic.positions(word)
+
+    def warm():
+        for word in words:
+            dic.positions(word)
+
+    def inserted():
+        dic.results.clear()
+        for word in words:
+            dic.inserted(word)
+
+    def inserted_cached():
+        for word in words:
+            dic.inserted(word)
+
+    def wrap():
+        hd.cache.clear()
+        for word in words:
+            dic.wrap(word, len(word) // 2 + 1)
+
+    results = {
+        'patterns': len(hd.patterns),
+        'parse_time': parse_time,
+        'parse_memory': parse_memory,
+        'nbytes': hd.nbytes,
+        'positions_cold': number / timed(cold, repeat),
+    }
+    cold()
+    results['positions_warm'] = number / timed(warm, repeat)
+    results['inserted'] = number / timed(inserted, repeat)
+    results['inserted_cached'] = number / timed(inserted_cached, repeat)
+    results['wrap'] = number / timed(wrap, repeat)
+
+    with tempfile.TemporaryDirectory() as directory:
+        compiled = os.path.join(directory, 'hyph.pyphen')
+        results['compile_time'] = timed(lambda: hd.save(compiled), repeat)
+        results['compiled_load_time'] = timed(
+            lambda: pyphen.HyphDict(compiled), repeat)
+        packed = pyphen.HyphDict(compiled)
+        results['compiled_nbytes'] = packed.nbytes
+        dic.hd = packed
+
+        def packed_cold():
+            packed.cache.clear()
+            for word in words:
+                dic.positions(word)
+
+        results['positions_packed'] = number / timed(packed_cold, repeat)
+        # close the memory-mapped file before removing it
+        dic.hd = packed = None
+        gc.collect()
+    return results
+
+
+def main(argv: Optional[List[str]] = None):
+    """Run the benchmark and print its results as JSON."""
+    parser = argparse.ArgumentParser(
+        prog='python -m tests.benchmark',
+        description='Benchmark the included dictionaries.')
+    parser.add_argument(
+        'languages', nargs='*', metavar='language',
+        help='language of the dictionary to benchmark, all by default')
+    parser.add_argument(
+        '-n', '--number', type=int, default=2000,
+        help='number of words hyphenated, 2000 by default')
+    parser.add_argument(
+        '-r', '--repeat', type=int, default=3,
+        help='number of runs of each measure, 3 by default')
+    parser.add_argument(
+        '-o', '--output', help='file where results are written, stdout by '
+        'default')
+    args = parser.parse_args(argv)
+
+    filenames: Dict[str, str] = {}
+    for language in args.languages or pyphen.LANGUAGES:
+        filename = pyphen.LANGUAGES[pyphen.language_fallback(language)]
+        filenames.setdefault(filename, language)
+
+    results = {
+        'pyphen': pyphen.VERSION,
+        'python': platform.python_implementation(),
+        'python_version': platform.python_version(),
+        'number': args.number,
+        'repeat': args.repeat,
+        'dictionaries': {
+            os.path.basename(filename): dict(
+                language=language,
+                **benchmark(filename, args.number, args.repeat))
+            for filename, language in filenames.items()},
+    }
+
+    if args.output:
+        with open(args.output, 'w') as stream:
+            json.dump(results, stream, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':  # pragma: no cover
+    main()
@@ -7,8 +7,21 @@ Tests can be launched with Pytest.
 
 """
 
+import asyncio
+import concurrent.futures
+import io
+import json
+import os
+import shutil
+import sys
+import threading
+from xml.etree import ElementTree
 
 import pyphen
+import pytest
+from pyphen.__main__ import main
+
+from . import benchmark
 
 
 def test_inserted():
@@ -24,6 +37,34 @@ def test_wrap():
         'autoband-', 'ventieldopje')
 
 
+def test_paragraph():
+    """Test the ``paragraph`` method."""
+    dic = pyphen.Pyphen(lang='nl_NL')
+    text = 'De lettergrepen van het autobandventieldopje worden gesplitst'
+    assert dic.paragraph(text, 16) == [
+        'De lettergrepen', 'van het auto-', 'bandventieldopje',
+        'worden gesplitst']
+    assert dic.paragraph(text, 48, measure=lambda string: 3 * len(string)) == (
+        dic.paragraph(text, 16))
+    lines = dic.paragraph(text, 12, hyphen='=')
+    assert max(len(line) for line in lines) <= 12
+    assert ' '.join(lines).replace('= ', '') == text
+    assert dic.paragraph('autobandventieldopje', 3) == [
+        'au-', 'to-', 'band-', 'ven-', 'tiel-', 'dop-', 'je']
+    assert dic.paragraph(' ', 10) == []
+
+    dic = pyphen.Pyphen(lang='hu', left=1, right=1)
+    assert dic.paragraph('ku kulissza', 4) == ['ku', 'ku-', 'lisz-', 'sza']
+
+    # hyphenated first parts can be wider than whole words
+    assert dic.paragraph('kulissza', 8, hyphen='---') == ['kulissza']
+    dic = pyphen.Pyphen(lang='nl_NL')
+    assert dic.paragraph(
+        'lettergrepen', 12,
+        measure=lambda string: len(string) + 3 * string.count('-')) == [
+            'lettergrepen']
+
+
 def test_iterate():
     """Test the ``iterate`` method."""
     dic = pyphen.Pyphen(lang='nl_NL')
@@ -112,3 +153,693 @@ def test_fallback():
     assert pyphen.language_fallback('sr-Cyrl') == 'sr'
     assert pyphen.language_fallback('fr-Latn-FR') == 'fr'
     assert pyphen.language_fallback('en-US_variant1-x') == 'en_US'
+
+
+def test_compiled(tmp_path):
+    """Test compiled dictionaries."""
+    filename = str(tmp_path / 'hyph_hu_HU.dic')
+    shutil.copyfile(pyphen.LANGUAGES['hu_HU'], filename)
+    hd = pyphen.HyphDict(filename)
+    assert hd.save() == str(tmp_path / 'hyph_hu_HU.pyphen')
+
+    compiled = pyphen.HyphDict(filename)
+    assert isinstance(compiled.patterns, pyphen.PackedPatterns)
+    assert len(compiled.patterns) == len(hd.patterns)
+    assert compiled.maxlen == hd.maxlen
+    for word in ('kulissza', 'asszonnyal', 'lettergrepen'):
+        assert compiled.positions(word) == hd.positions(word)
+        assert [position.data for position in compiled.positions(word)] == [
+            position.data for position in hd.positions(word)]
+
+    # keys are read from the header of compiled dictionaries
+    assert compiled.digest == hd.digest
+    assert pyphen._compiled_digest(filename, hd.source) == hd.digest
+    pyphen.digests.clear()
+    assert pyphen.dictionary_key(filename) == hd.digest
+    assert pyphen.dictionary_key(str(tmp_path / 'hyph_hu_HU.pyphen')) == (
+        hd.digest)
+
+    dic = pyphen.Pyphen(filename=str(tmp_path / 'hyph_hu_HU.pyphen'))
+    assert dic.inserted('kulissza') == 'ku-lisz-sza'
+
+
+def test_compiled_outdated(tmp_path):
+    """Test that outdated compiled dictionaries are ignored."""
+    filename = tmp_path / 'hyph_nl_NL.dic'
+    shutil.copyfile(pyphen.LANGUAGES['nl_NL'], str(filename))
+    pyphen.HyphDict(str(filename)).save()
+    with filename.open('ab') as stream:
+        stream.write(b'\n1le1\n')
+    hd = pyphen.HyphDict(str(filename))
+    assert isinstance(hd.patterns, dict)
+    assert hd.patterns['le'] == (0, (1, 0, 1))
+    assert pyphen._compiled_digest(str(filename), hd.source) is None
+
+
+def test_matches():
+    """Test that the automaton finds the patterns included in a string."""
+    hd = pyphen.HyphDict(pyphen.LANGUAGES['hu_HU'])
+    for word in ('.kulissza.', '.asszonnyal.', '.lettergrepen.'):
+        assert hd.trie.matches(word) == [
+            (i, hd.patterns[word[i:j]])
+            for i in range(len(word)) for j in range(i + 1, len(word) + 1)
+            if word[i:j] in hd.patterns]
+
+
+def test_parsed_packed():
+    """Test that parsed and packed patterns give the same positions."""
+    parsed = pyphen.HyphDict(pyphen.LANGUAGES['de_DE'])
+    packed = pyphen.HyphDict(pyphen.LANGUAGES['de_DE'], compact=True)
+    assert isinstance(parsed.patterns, dict)
+    for word in (
+            'donaudampfschiff', 'kapitän', 'silbentrennung', 'zusammen',
+            'ausnahmsweise', 'straßenbahnhaltestelle', 'a', ''):
+        assert parsed._positions(word, None) == (
+            packed._positions(word, None))
+        assert parsed._positions(word, (2, 5)) == (
+            packed._positions(word, (2, 5)))
+
+
+def test_cache_size():
+    """Test the size of the words cache."""
+    hd = pyphen.HyphDict(pyphen.LANGUAGES['nl_NL'], cache_size=2)
+    for word in ('lettergrepen', 'autobandventieldopje', 'lettergrepen'):
+        hd.positions(word)
+    assert hd.cache.info() == {
+        'hits': 1, 'misses': 2, 'evictions': 0, 'size': 2, 'maxsize': 2}
+    hd.positions('Amsterdam')
+    assert 'autobandventieldopje' not in hd.cache
+    assert 'lettergrepen' in hd.cache
+    assert hd.cache.evictions == 1
+    hd.cache.resize(1)
+    assert len(hd.cache) == 1
+    assert hd.positions('lettergrepen') == [3, 6, 9]
+
+    dic = pyphen.Pyphen(lang='nl_NL', cache=False, cache_size=2)
+    assert dic.hd.cache.maxsize == 2
+    for word in ('lettergrepen', 'autobandventieldopje', 'Amsterdam'):
+        dic.inserted(word)
+    assert len(dic.hd.cache) == 2
+
+    # the size of shared words caches is not changed by other users
+    dic.hd.cache.resize(3)
+    with pytest.warns(UserWarning):
+        assert pyphen.Pyphen(lang='nl_NL', cache_size=4).hd is dic.hd
+    assert dic.hd.cache.maxsize == 3
+    assert dic.inserted('lettergrepen') == 'let-ter-gre-pen'
+
+
+def test_languages_lazy():
+    """Test that the dictionaries folder is listed when first needed."""
+    languages = pyphen.Languages(pyphen.dictionaries_root)
+    assert languages._languages is None
+    assert 'nl' in languages
+    assert languages['nl'] == languages['nl_NL'] == pyphen.LANGUAGES['nl_NL']
+    assert languages._languages is not None
+
+
+def test_identical_dictionaries(tmp_path):
+    """Test that identical dictionaries share their patterns."""
+    assert pyphen.Pyphen(lang='de_AT').hd is pyphen.Pyphen(lang='de_CH').hd
+    assert pyphen.Pyphen(lang='de_CH').hd is pyphen.Pyphen(lang='de_DE').hd
+    assert pyphen.Pyphen(lang='nb_NO').hd is pyphen.Pyphen(lang='nn_NO').hd
+    assert pyphen.Pyphen(lang='nb_NO').hd is not pyphen.Pyphen(lang='sv').hd
+
+    # keys of files read once are known without reading them again
+    first, second = tmp_path / 'hyph_first.dic', tmp_path / 'hyph_second.dic'
+    shutil.copyfile(pyphen.LANGUAGES['hu_HU'], str(first))
+    shutil.copyfile(pyphen.LANGUAGES['hu_HU'], str(second))
+    with second.open('ab') as stream:
+        stream.write(b'% comment\n')
+    assert pyphen.dictionary_key(str(first), read=False) is None
+    hd = pyphen.Pyphen(filename=str(first)).hd
+    assert pyphen.dictionary_key(str(first), read=False) == hd.digest
+    assert pyphen.Pyphen(filename=str(second)).hd is hd
+    assert pyphen.dictionary_key(str(second), read=False) == hd.digest
+
+
+def test_positions_copy():
+    """Test that changing positions doesn't change the cached positions."""
+    dic = pyphen.Pyphen(lang='nl_NL')
+    dic.positions('lettergrepen').clear()
+    assert dic.positions('lettergrepen') == [3, 6, 9]
+    assert dic.inserted('lettergrepen') == 'let-ter-gre-pen'
+    first, second = dic.positions_many(['Amsterdam', 'Amsterdam'])
+    first.clear()
+    assert second == [2, 6]
+    assert dic.positions('Amsterdam') == [2, 6]
+
+
+def test_many():
+    """Test the ``positions_many`` and ``inserted_many`` methods."""
+    dic = pyphen.Pyphen(lang='nl_NL')
+    words = ['lettergrepen', 'Amsterdam', 'lettergrepen', 'LETTERGREPEN']
+    assert dic.positions_many(words) == [
+        [3, 6, 9], [2, 6], [3, 6, 9], [3, 6, 9]]
+    assert dic.inserted_many(iter(words), hyphen='=') == [
+        'let=ter=gre=pen', 'Am=ster=dam', 'let=ter=gre=pen',
+        'LET=TER=GRE=PEN']
+    assert dic.inserted_many([]) == []
+
+    # case variants share their cache lookup
+    hd = pyphen.HyphDict(pyphen.LANGUAGES['nl_NL'])
+    dic.hd = hd
+    assert dic.positions_many(words) == [
+        [3, 6, 9], [2, 6], [3, 6, 9], [3, 6, 9]]
+    assert hd.cache.info()['misses'] == 2 and len(hd.cache) == 2
+    assert dic.positions_many(['Lettergrepen', 'amsterdam']) == [
+        [3, 6, 9], [2, 6]]
+    assert hd.cache.info()['hits'] == 2
+
+    dic = pyphen.Pyphen(
+        lang='hu', left=1, right=1, exceptions=['kul-issza'], compounds=True)
+    words = ['kulissza', 'KULISSZA', 'a-kulissza', 'asszonnyal']
+    assert dic.inserted_many(words) == [
+        dic.inserted(word) for word in words] == [
+            'kul-issza', 'KUL-ISSZA', 'a-kul-issza', 'asz-szony-nyal']
+
+
+def test_inserted_parallel():
+    """Test the ``inserted_parallel`` method."""
+    dic = pyphen.Pyphen(lang='nl_NL', left=4)
+    words = ['lettergrepen', 'Amsterdam', 'autobandventieldopje'] * 5
+    assert list(dic.inserted_parallel(
+        words, hyphen='=', processes=2, chunksize=2)) == [
+            'letter=gre=pen', 'Amster=dam', 'auto=band=ven=tiel=dop=je'] * 5
+    assert list(dic.inserted_parallel([], processes=1)) == []
+
+    dic = pyphen.Pyphen(lang='nl_NL', exceptions=['letter-grepen'])
+    assert list(dic.inserted_parallel(
+        ['lettergrepen', 'Amsterdam'], processes=1)) == [
+            'letter-grepen', 'Am-ster-dam']
+
+
+def test_inserted_text():
+    """Test the ``inserted_text`` method."""
+    dic = pyphen.Pyphen(lang='nl_NL')
+    assert dic.inserted_text('De lettergrepen, in Amsterdam!') == (
+        'De let-ter-gre-pen, in Am-ster-dam!')
+    te = pyphen.Pyphen(lang='te_IN', left=1, right=1)
+    assert te.inserted_text('తెలుగు భాష') == 'తె-లు-గు భా-ష'
+
+
+def test_inserted_stream():
+    """Test the ``inserted_stream`` method."""
+    dic = pyphen.Pyphen(lang='nl_NL')
+    text = 'De lettergrepen, in Amsterdam!\nAutobandventieldopje '
+    expected = (
+        'De let-ter-gre-pen, in Am-ster-dam!\nAu-to-band-ven-tiel-dop-je ')
+    for size in (1, 2, 5, 7, 100):
+        chunks = [text[i:i + size] for i in range(0, len(text), size)]
+        assert ''.join(dic.inserted_stream(chunks)) == expected
+        stream = io.StringIO(text)
+        assert ''.join(dic.inserted_stream(stream, size=size)) == expected
+    assert ''.join(dic.inserted_stream(['letter', 'grepen'])) == (
+        'let-ter-gre-pen')
+    assert list(dic.inserted_stream([])) == []
+
+
+def test_inserted_html():
+    """Test the ``inserted_html`` method."""
+    dic = pyphen.Pyphen(lang='nl_NL')
+    html = (
+        '<!DOCTYPE html><html><head><title>lettergrepen</title>'
+        '<script>"<b>lettergrepen</b>"</script></head>'
+        '<body><P class="lettergrepen">Lettergrepen &amp; lettergrepen'
+        '<!-- lettergrepen --></P><pre>lettergrepen <b>lettergrepen</b></pre>'
+        '<code/>lettergrepen<CODE>lettergrepen</CODE>&#32;lettergrepen'
+        '</body></html>')
+    hyphenated = (
+        '<!DOCTYPE html><html><head><title>lettergrepen</title>'
+        '<script>"<b>lettergrepen</b>"</script></head>'
+        '<body><P class="lettergrepen">Let-ter-gre-pen &amp; let-ter-gre-pen'
+        '<!-- lettergrepen --></P><pre>lettergrepen <b>lettergrepen</b></pre>'
+        '<code/>let-ter-gre-pen<CODE>lettergrepen</CODE>&#32;let-ter-gre-pen'
+        '</body></html>')
+    assert ''.join(dic.inserted_html([html], '-')) == hyphenated
+    for size in (1, 5, 16):
+        chunks = [html[i:i + size] for i in range(0, len(html), size)]
+        assert ''.join(dic.inserted_html(chunks, '-')) == hyphenated
+    assert ''.join(dic.inserted_html(io.StringIO(html), '-', size=7)) == (
+        hyphenated)
+    assert ''.join(dic.inserted_html(['<p>lettergrepen</p><script>a'])) == (
+        '<p>let\u00adter\u00adgre\u00adpen</p><script>a')
+    xml = ''.join(dic.inserted_html(['<?xml version="1.0"?><p>Amsterdam</p>']))
+    assert ElementTree.fromstring(xml).text == 'Am\u00adster\u00addam'
+
+    dic = pyphen.Pyphen(lang='de_DE')
+    for html, hyphenated in (
+            ('<p>Gr&#252;nderzeitvillen</p>',
+             '<p>Gr&#252;n-der-zeit-vil-len</p>'),
+            ('<p>Stra&szlig;enbahn &AMP; Stra&szligenbahn</p>',
+             '<p>Stra-&szlig;en-bahn &AMP; Stra-&szligenbahn</p>'),
+            ('<p>Gr&#xFC;nderzeit&unknown;villen</p>',
+             '<p>Gr&#xFC;n-der-zeit&unknown;vil-len</p>')):
+        assert ''.join(dic.inserted_html([html], '-')) == hyphenated
+        assert ''.join(dic.inserted_html(html, '-')) == hyphenated
+    dic = pyphen.Pyphen(lang='hu', left=1, right=1)
+    assert ''.join(dic.inserted_html(['ku&#108;issza KULI&#83;SZA'], '-')) == (
+        'ku-&#108;isz-sza KU-LI&#83;SZA')
+    dic = pyphen.Pyphen(lang='hu', left=0, right=0)
+    assert dic.inserted('legvíz') == '-leg-víz-'
+    assert ''.join(dic.inserted_html(['<p>&#108;egvíz</p>'], '-')) == (
+        '<p>-&#108;eg-víz-</p>')
+
+
+def test_inserted_html_updatepos(monkeypatch):
+    """Test that ``inserted_html`` fails when parts are not all given."""
+    from _markupbase import ParserBase
+
+    from pyphen.markup import HyphenationParser
+
+    dic = pyphen.Pyphen(lang='nl_NL')
+    monkeypatch.setattr(
+        HyphenationParser, 'updatepos', ParserBase.updatepos)
+    for html in ('<p>lettergrepen</p>', 'lettergrepen', '&amp;'):
+        with pytest.raises(RuntimeError):
+            ''.join(dic.inserted_html([html]))
+
+
+def test_inserted_html_copy():
+    """Test that ``inserted_html`` copies each part of documents."""
+    dic = pyphen.Pyphen(lang='nl_NL')
+    for html in (
+            '<!DOCTYPE html><html lang="nl"><head><title>a &amp; b</title>'
+            '<style>p > a { color: red }</style></head><body>'
+            '<p class=a id=\'b\' hidden>lettergrepen&nbsp;&#160;&#xA0;'
+            '&unknown; &amp &#0; < > &</p><!-- comment --><!--->'
+            '<![CDATA[lettergrepen]]><?php echo 1 ?><!bogus><br/><img src=x>'
+            '</p></body></html>',
+            '<?xml version="1.0"?><!DOCTYPE doc [<!ENTITY e "e">]>'
+            '<doc><a b="&e;">&e;lettergrepen</a><c/></doc>',
+            '<script>if (a < b) { c(\'</p>\') }</script><p>unclosed <b',
+            '<p>lettergrepen <!-- unclosed'):
+        assert ''.join(dic.inserted_html([html], '')) == html
+        assert ''.join(dic.inserted_html(html, '')) == html
+
+
+def test_persistent_cache(tmp_path):
+    """Test the persistent cache of positions."""
+    filename = tmp_path / 'hyph_hu_HU.dic'
+    cache = str(tmp_path / 'cache.json')
+    shutil.copyfile(pyphen.LANGUAGES['hu_HU'], str(filename))
+    hd = pyphen.HyphDict(str(filename))
+    assert hd.load_cache(cache) == 0
+    hd.positions('kulissza')
+    hd.positions('kulissza', (2, 6))
+    hd.positions('lettergrepen')
+    hd.save_cache(cache)
+
+    hd = pyphen.HyphDict(str(filename), cache_size=1)
+    assert hd.load_cache(cache) == 3
+    assert list(hd.cache.data) == ['lettergrepen']
+    hd = pyphen.HyphDict(str(filename))
+    assert hd.load_cache(cache) == 3
+    assert hd.cache.get(('kulissza', (2, 6))) == [2, 5]
+    positions = hd.cache.get('kulissza')
+    assert positions == [0, 2, 5]
+    assert [position.data for position in positions] == [
+        None, None, ('sz=', -1, 1)]
+
+    with filename.open('ab') as stream:
+        stream.write(b'\n1le1\n')
+    assert pyphen.HyphDict(str(filename)).load_cache(cache) == 0
+
+
+@pytest.mark.skipif(
+    sys.version_info < (3, 8), reason='shared memory needs Python 3.8')
+def test_shared_memory():
+    """Test patterns stored in shared memory."""
+    filename = pyphen.LANGUAGES['hu_HU']
+    shared_memory = pyphen.HyphDict(filename).share()
+    try:
+        hd = pyphen.HyphDict.attach(shared_memory.name, filename)
+        assert isinstance(hd.patterns, pyphen.PackedPatterns)
+        assert hd.positions('kulissza') == [0, 2, 5]
+        dic = pyphen.Pyphen(
+            lang='hu', left=1, right=1, cache=False,
+            shared_memory=shared_memory.name)
+        assert dic.hd.shared_memory.name == shared_memory.name
+        assert dic.inserted('kulissza') == 'ku-lisz-sza'
+    finally:
+        shared_memory.unlink()
+
+
+def test_compact():
+    """Test compact patterns."""
+    hd = pyphen.HyphDict(pyphen.LANGUAGES['hu_HU'], compact=True)
+    assert isinstance(hd.patterns, pyphen.PackedPatterns)
+    positions = hd.positions('kulissza')
+    assert positions == [0, 2, 5]
+    assert [position.data for position in positions] == [
+        None, None, ('sz=', -1, 1)]
+    dic = pyphen.Pyphen(lang='nl_NL', cache=False, compact=True)
+    assert isinstance(dic.hd.patterns, pyphen.PackedPatterns)
+    assert dic.inserted('lettergrepen') == 'let-ter-gre-pen'
+
+
+def test_compile_command(tmp_path, capsys):
+    """Test the ``compile`` command."""
+    main(['compile', 'nl', 'nl_NL', 'hu-HU', '--output', str(tmp_path)])
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        'hyph_hu_HU.pyphen', 'hyph_nl_NL.pyphen']
+    output = capsys.readouterr().out
+    assert output.startswith('hyph_nl_NL.dic: 16256 patterns, parsed in ')
+    assert output.count('\n') == 2
+    dic = pyphen.Pyphen(filename=str(tmp_path / 'hyph_nl_NL.pyphen'))
+    assert isinstance(dic.hd.patterns, pyphen.PackedPatterns)
+    assert dic.inserted('lettergrepen') == 'let-ter-gre-pen'
+
+
+def test_benchmark(tmp_path):
+    """Test the benchmark of the included dictionaries."""
+    hd = pyphen.HyphDict(pyphen.LANGUAGES['it_IT'])
+    words = benchmark.words_of(hd, 10)
+    assert len(words) == 10
+    assert words == benchmark.words_of(hd, 10)
+
+    output = tmp_path / 'benchmark.json'
+    benchmark.main(['it', 'it_IT', '-n', '10', '-r', '1', '-o', str(output)])
+    results = json.loads(output.read_text())
+    assert list(results['dictionaries']) == ['hyph_it_IT.dic']
+    it = results['dictionaries']['hyph_it_IT.dic']
+    assert it['language'] == 'it'
+    assert it['patterns'] == len(hd.patterns)
+    assert it['positions_warm'] > 0 and it['wrap'] > 0
+    assert it['inserted'] > 0 and it['inserted_cached'] > 0
+    assert it['nbytes'] > it['compiled_nbytes'] > 0
+    assert it['compiled_load_time'] > 0 and it['positions_packed'] > 0
+
+
+def test_hyphdict_cache(monkeypatch):
+    """Test the cache of dictionaries."""
+    dic = pyphen.Pyphen(lang='nl_NL')
+    assert pyphen.hdcache.resident()[-1] == pyphen.LANGUAGES['nl_NL']
+
+    nl, hu, fr = (
+        pyphen.HyphDict(pyphen.LANGUAGES[lang]) for lang in ('nl', 'hu', 'fr'))
+    cache = pyphen.HyphDictCache(maxsize=2)
+    cache['nl'], cache['hu'] = nl, hu
+    assert cache['nl'] is nl
+    cache['fr'] = fr
+    assert cache.resident() == [nl.filename, fr.filename]
+    assert cache.evictions == 1
+
+    assert hu.nbytes > fr.nbytes > 0
+    cache.resize(None, maxbytes=fr.nbytes + nl.nbytes)
+    cache['hu'] = hu
+    assert cache.resident() == [hu.filename]
+    cache['nl'] = nl
+    assert cache.resident() == [nl.filename]
+    cache.resize(None, maxbytes=hu.nbytes + nl.nbytes)
+    cache['hu'] = hu
+    assert cache.resident() == [nl.filename, hu.filename]
+    assert cache.nbytes == hu.nbytes + nl.nbytes
+    assert dic.inserted('lettergrepen') == 'let-ter-gre-pen'
+
+    # the budget is kept when the maximum size changes, and includes the
+    # automata built later
+    nl, hu = (
+        pyphen.HyphDict(pyphen.LANGUAGES[lang]) for lang in ('nl', 'hu'))
+    cache = pyphen.HyphDictCache(maxbytes=nl.nbytes + hu.nbytes)
+    cache.resize(5)
+    assert cache.maxbytes == nl.nbytes + hu.nbytes
+    cache['nl'], cache['hu'] = nl, hu
+    monkeypatch.setattr(pyphen, 'hdcache', cache)
+    nl.trie
+    assert cache.resident() == [hu.filename]
+    cache.resize(None, None)
+    assert cache.maxbytes is None
+
+    # sizes of objects are estimated when they are not available
+    def getsizeof(object):
+        raise TypeError
+
+    size = pyphen.HyphDict(pyphen.LANGUAGES['nl']).nbytes
+    monkeypatch.setattr(pyphen.sys, 'getsizeof', getsizeof)
+    hd = pyphen.HyphDict(pyphen.LANGUAGES['nl'])
+    assert size / 2 < hd.nbytes < size * 2
+    hd.trie
+    assert hd.nbytes > size / 2 + memoryview(hd.trie.buffer).nbytes
+
+
+def test_preload(monkeypatch):
+    """Test the ``preload`` function."""
+    futures = pyphen.preload(['nl_NL', 'fr', 'nl'])
+    assert set(futures) == {'nl_NL', 'fr', 'nl'}
+    assert futures['nl'] is futures['nl_NL']
+    concurrent.futures.wait(futures.values())
+    hd = futures['fr'].result()
+    assert hd.filename in pyphen.hdcache.resident()
+    assert pyphen.Pyphen(lang='fr').hd is hd
+
+    # dictionaries loaded by processes keep their patterns packed
+    monkeypatch.setattr(pyphen, 'hdcache', pyphen.HyphDictCache())
+    futures = pyphen.preload(['sv', 'nl'], processes=2)
+    assert futures['sv'].result().positions('hyphenation')
+    assert isinstance(futures['sv'].result().patterns, pyphen.PackedPatterns)
+    assert futures['nl'].result().filename == pyphen.LANGUAGES['nl_NL']
+    assert pyphen.Pyphen(lang='sv').hd is futures['sv'].result()
+
+    futures = pyphen.preload(['nl'], background=False)
+    assert futures['nl'].done()
+    assert pyphen.preload([]) == {}
+
+    # threads are started for each file, not for each language
+    workers = []
+
+    class ThreadPoolExecutor(concurrent.futures.ThreadPoolExecutor):
+        def __init__(self, max_workers):
+            workers.append(max_workers)
+            super().__init__(max_workers)
+
+    monkeypatch.setattr(
+        concurrent.futures, 'ThreadPoolExecutor', ThreadPoolExecutor)
+    concurrent.futures.wait(pyphen.preload(['nl', 'nl_NL']).values())
+    languages = ['nl', 'nl_NL', 'fr', 'sv', 'hu', 'it']
+    concurrent.futures.wait(pyphen.preload(languages).values())
+    assert workers == [1, min(5, os.cpu_count())]
+
+
+def test_window():
+    """Test the positions restricted to a window."""
+    hd = pyphen.HyphDict(pyphen.LANGUAGES['hu_HU'])
+    assert hd.positions('kulissza', (1, 7)) == [2, 5]
+    assert hd.positions('kulissza', (3, 4)) == []
+    assert hd.positions('kulissza', (5, 5))[0].data == ('sz=', -1, 1)
+    dic = pyphen.Pyphen(lang='nl_NL', left=4, right=4)
+    assert dic.positions('lettergrepen') == [6]
+    assert ('lettergrepen', (4, 8)) in dic.hd.cache
+
+
+def test_wrap_window():
+    """Test the ``wrap`` method with words whose positions are not cached."""
+    dic = pyphen.Pyphen(lang='nl_NL', cache=False)
+    assert dic.wrap('autobandventieldopje', 11) == (
+        'autoband-', 'ventieldopje')
+    assert dic.wrap('autobandventieldopje', 3) == (
+        'au-', 'tobandventieldopje')
+    assert dic.wrap('autobandventieldopje', 2) is None
+    for width in range(3, 19):
+        dic.wrap('autobandventieldopje', width)
+    assert dic.wrap('autobandventieldopje', 11.5) == (
+        'autoband-', 'ventieldopje')
+    assert len(dic.hd.cache) == 0
+    assert dic.wrap('autobandventieldopje', float('inf')) == (
+        'autobandventieldop-', 'je')
+    assert dic.wrap('autobandventieldopje', float('nan')) is None
+    assert dic.hd.cache.items() == [
+        (('autobandventieldopje', (2, 18)), [2, 4, 8, 11, 15, 18])]
+    assert dic.inserted('autobandventieldopje') == (
+        'au-to-band-ven-tiel-dop-je')
+    assert dic.wrap('autobandventieldopje', 11) == (
+        'autoband-', 'ventieldopje')
+    assert dic.hd.cache.info()['misses'] == 1
+    dic = pyphen.Pyphen(lang='hu', left=1, right=1)
+    assert dic.wrap('kulissza', 7) == ('kulisz-', 'sza')
+    assert dic.wrap('KULISSZA', 6) == ('KU-', 'LISSZA')
+
+
+def test_wrap_measure():
+    """Test the ``wrap`` method with a width function."""
+    measured = []
+
+    def measure(string):
+        measured.append(string)
+        return 2 * len(string)
+
+    dic = pyphen.Pyphen(lang='nl_NL')
+    word = 'autobandventieldopje'
+    assert dic.wrap(word, 22, measure=measure) == dic.wrap(word, 11)
+    assert len(measured) == 3
+    assert dic.wrap(word, 22, measure=measure) == dic.wrap(word, 11)
+    assert len(measured) == 3
+    for width in range(30):
+        assert dic.wrap(word, width, '=', measure) == (
+            dic.wrap(word, width // 2, '='))
+    assert dic.wrap(word, 2, measure=len) is None
+    dic.wrap(word, 11, measure=len)
+    dic.left = 9
+    assert dic.wrap(word, 11, measure=len) is dic.wrap(word, 11) is None
+    dic.left = 2
+
+    dic = pyphen.Pyphen(lang='nl_NL', widths_size=10)
+    for _ in range(100):
+        dic.wrap(word, 22, measure=lambda string: 2 * len(string))
+    assert dic.widths.info()['size'] == 10
+    assert pyphen.Pyphen(lang='nl_NL').widths.maxsize == 4096
+
+    dic = pyphen.Pyphen(lang='hu', left=1, right=1)
+    assert dic.wrap('kulissza', 7, measure=len) == ('kulisz-', 'sza')
+    assert dic.wrap('KULISSZA', 6, measure=len) == ('KU-', 'LISSZA')
+
+
+def test_exceptions():
+    """Test the hyphenation exceptions."""
+    dic = pyphen.Pyphen(
+        lang='nl_NL', exceptions=['Letter-gre-pen\n', 'ams-ter-dam', 'x'])
+    assert dic.inserted('lettergrepen') == 'letter-gre-pen'
+    assert dic.inserted('LETTERGREPEN') == 'LETTER-GRE-PEN'
+    assert dic.inserted('x') == 'x'
+    assert dic.wrap('Amsterdam', 6) == ('Ams-', 'terdam')
+    assert dic.inserted('autobandventieldopje') == 'au-to-band-ven-tiel-dop-je'
+    dic = pyphen.Pyphen(lang='nl_NL', left=4, exceptions=['ams-ter-dam'])
+    assert tuple(dic.iterate('Amsterdam')) == (('Amster', 'dam'),)
+
+
+def test_compounds():
+    """Test the compound mode."""
+    dic = pyphen.Pyphen(lang='de_DE', cache=False)
+    assert dic.inserted('Donaudampfschiff-Kapitän') == (
+        'Do-nau-dampf-schiff---Ka-pi-tän')
+    dic = pyphen.Pyphen(lang='de_DE', cache=False, compounds=True)
+    assert dic.inserted('Donaudampfschiff-Kapitän') == (
+        'Do-nau-dampf-schiff-Ka-pi-tän')
+    assert dic.wrap('Donaudampfschiff-Kapitän', 20) == (
+        'Donaudampfschiff-Ka-', 'pitän')
+    assert sorted(key for key, _ in dic.hd.cache.items()) == [
+        ('donaudampfschiff', (2, 14)), ('kapitän', (2, 5))]
+    assert dic.inserted('Kapitän') == 'Ka-pi-tän'
+    assert len(dic.hd.cache) == 2
+    for width in (17, 18, 19):
+        assert dic.wrap('Donaudampfschiff-Kapitän', width) == (
+            'Donaudampfschiff-', 'Kapitän')
+        assert dic.wrap('Donaudampfschiff-Kapitän', width, measure=len) == (
+            'Donaudampfschiff-', 'Kapitän')
+    assert ('Donaudampfschiff-', 'Kapitän') in (
+        dic.iterate('Donaudampfschiff-Kapitän'))
+    assert dic.paragraph('Das Donaudampfschiff-Kapitän fährt', 12) == [
+        'Das Donau-', 'dampfschiff-', 'Kapitän', 'fährt']
+
+    dic = pyphen.Pyphen(lang='en_US', compounds=True)
+    assert dic.inserted("rock'n'roll-hyphenation") == (
+        "rock'n'roll-hy-phen-ation")
+    dic = pyphen.Pyphen(lang='hu', left=1, right=1, compounds=True)
+    assert dic.inserted('a-kulissza') == 'a-ku-lisz-sza'
+
+    for compounds in (False, True):
+        dic = pyphen.Pyphen(lang='de_DE', compounds=compounds)
+        words = ['Schiff-Kapitän', 'Kapitän']
+        assert list(dic.inserted_parallel(words, processes=1)) == [
+            dic.inserted(word) for word in words]
+    assert dic.inserted('Schiff-Kapitän') == 'Schiff-Ka-pi-tän'
+
+
+def test_results_cache():
+    """Test the cache of results."""
+    dic = pyphen.Pyphen(lang='nl_NL', results_size=3)
+    for _ in range(2):
+        assert dic.inserted('Lettergrepen') == 'Let-ter-gre-pen'
+        assert dic.inserted('LETTERGREPEN', '=') == 'LET=TER=GRE=PEN'
+        assert tuple(dic.iterate('Amsterdam')) == (
+            ('Amster', 'dam'), ('Am', 'sterdam'))
+    assert dic.results.info()['hits'] == 3
+    assert dic.results.info()['size'] == 3
+
+    dic.left = 4
+    assert dic.inserted('Lettergrepen') == 'Letter-gre-pen'
+    assert tuple(dic.iterate('Amsterdam')) == (('Amster', 'dam'),)
+    assert dic.results.info()['evictions'] == 2
+
+    dic = pyphen.Pyphen(lang='hu', left=1, right=1, results_size=None)
+    assert dic.inserted('KULISSZA') == dic.inserted('KULISSZA') == (
+        'KU-LISZ-SZA')
+
+    # results are cleared when compounds and exceptions are set
+    dic = pyphen.Pyphen(lang='de_DE', results_size=None)
+    assert dic.inserted('Schiff-Kapitän') == 'Schiff---Ka-pi-tän'
+    dic.compounds = True
+    assert dic.inserted('Schiff-Kapitän') == 'Schiff-Ka-pi-tän'
+    dic.exceptions = pyphen.Pyphen(exceptions=['kapi-tän']).exceptions
+    assert dic.inserted('Schiff-Kapitän') == 'Schiff-Kapi-tän'
+
+    # results are not cached by default
+    dic = pyphen.Pyphen(lang='nl_NL')
+    assert dic.inserted('Lettergrepen') == 'Let-ter-gre-pen'
+    assert tuple(dic.iterate('Amsterdam')) == (
+        ('Amster', 'dam'), ('Am', 'sterdam'))
+    assert dic.results.info()['misses'] == len(dic.results) == 0
+
+
+def test_threads(tmp_path):
+    """Test dictionaries shared by threads."""
+    filename = str(tmp_path / 'hyph_nl_NL.dic')
+    shutil.copyfile(pyphen.LANGUAGES['nl_NL'], filename)
+    words = ['lettergrepen', 'Amsterdam', 'autobandventieldopje'] * 100
+    barrier = threading.Barrier(8)
+
+    def hyphenate(_):
+        barrier.wait()
+        dic = pyphen.Pyphen(filename=filename)
+        dic.hd.cache.resize(2)
+        return dic.hd, [dic.inserted(word) for word in words]
+
+    with concurrent.futures.ThreadPoolExecutor(8) as executor:
+        results = list(executor.map(hyphenate, range(8)))
+    assert len({id(hd) for hd, _ in results}) == 1
+    assert all(inserted == results[0][1] for _, inserted in results)
+    assert results[0][1][:3] == [
+        'let-ter-gre-pen', 'Am-ster-dam', 'au-to-band-ven-tiel-dop-je']
+
+
+def test_threads_load_once(tmp_path, monkeypatch):
+    """Test that dictionaries needed by threads are only parsed once."""
+    filename = str(tmp_path / 'hyph_nl_NL.dic')
+    shutil.copyfile(pyphen.LANGUAGES['nl_NL'], filename)
+    parsed = []
+    init = pyphen.HyphDict.__init__
+
+    def count(self, *args, **kwargs):
+        parsed.append(args[0])
+        init(self, *args, **kwargs)
+
+    monkeypatch.setattr(pyphen.HyphDict, '__init__', count)
+    barrier = threading.Barrier(8)
+
+    def load(arguments):
+        barrier.wait()
+        return pyphen.Pyphen(**arguments).hd
+
+    for arguments in ({'filename': filename}, {'lang': 'nl_NL'}):
+        monkeypatch.setattr(pyphen, 'hdcache', pyphen.HyphDictCache())
+        with concurrent.futures.ThreadPoolExecutor(8) as executor:
+            hds = list(executor.map(load, [arguments] * 8))
+        assert len({id(hd) for hd in hds}) == 1
+    assert parsed == [filename, pyphen.LANGUAGES['nl_NL']]
+
+
+def test_async():
+    """Test the asyncio methods."""
+    async def hyphenate():
+        dic = await pyphen.Pyphen.aload(lang='nl_NL', left=4)
+        text = 'De lettergrepen, in Amsterdam! ' * 10
+        assert await dic.ainserted_text(text, size=7) == (
+            'De letter-gre-pen, in Amster-dam! ' * 10)
+        assert await dic.ainserted_text('') == ''
+
+    # asyncio.run is not available before Python 3.7
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(hyphenate())
+    finally:
+        loop.close()